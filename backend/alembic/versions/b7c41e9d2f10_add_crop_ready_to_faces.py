@@ -0,0 +1,28 @@
+"""add crop_ready to faces
+
+Revision ID: b7c41e9d2f10
+Revises: e66e11abb0d5
+Create Date: 2026-10-17 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c41e9d2f10'
+down_revision = 'e66e11abb0d5'
+branch_labels = None
+depends_on = None
+
+
+from app.core.config import settings
+
+def upgrade() -> None:
+    op.add_column('faces', sa.Column('crop_ready', sa.Boolean(), server_default=sa.false(), nullable=False), schema=settings.DB_SCHEMA)
+    # Existing faces were served as covers without a check; keep them visible
+    op.execute(f"UPDATE {settings.DB_SCHEMA}.faces SET crop_ready = true")
+
+
+def downgrade() -> None:
+    op.drop_column('faces', 'crop_ready', schema=settings.DB_SCHEMA)
@@ -0,0 +1,36 @@
+"""add photo keyset indexes
+
+Revision ID: c3d8a1f5e7b2
+Revises: b7c41e9d2f10
+Create Date: 2026-10-17 15:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d8a1f5e7b2'
+down_revision = 'b7c41e9d2f10'
+branch_labels = None
+depends_on = None
+
+
+from app.core.config import settings
+
+def upgrade() -> None:
+    # list_photos filters (user_id, storage_provider), orders by (taken_at|uploaded_at, photo_id)
+    # and seeks on that pair; both directions are one range scan (DESC scans backwards)
+    try:
+        op.create_index('idx_photos_user_provider_taken_id', 'photos', ['user_id', 'storage_provider', 'taken_at', 'photo_id'], unique=False, schema=settings.DB_SCHEMA, postgresql_where='deleted_at IS NULL')
+        op.create_index('idx_photos_user_provider_uploaded_id', 'photos', ['user_id', 'storage_provider', 'uploaded_at', 'photo_id'], unique=False, schema=settings.DB_SCHEMA, postgresql_where='deleted_at IS NULL')
+    except Exception:
+        pass
+    # Prefix of idx_photos_user_provider_taken_id
+    op.execute(f"DROP INDEX IF EXISTS {settings.DB_SCHEMA}.idx_photos_user_provider_taken")
+
+
+def downgrade() -> None:
+    op.create_index('idx_photos_user_provider_taken', 'photos', ['user_id', 'storage_provider', 'taken_at'], unique=False, schema=settings.DB_SCHEMA, postgresql_where='deleted_at IS NULL')
+    op.drop_index('idx_photos_user_provider_uploaded_id', table_name='photos', schema=settings.DB_SCHEMA)
+    op.drop_index('idx_photos_user_provider_taken_id', table_name='photos', schema=settings.DB_SCHEMA)
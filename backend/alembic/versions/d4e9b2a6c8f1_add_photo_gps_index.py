@@ -0,0 +1,30 @@
+"""add photo gps index
+
+Revision ID: d4e9b2a6c8f1
+Revises: c3d8a1f5e7b2
+Create Date: 2026-10-17 16:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e9b2a6c8f1'
+down_revision = 'c3d8a1f5e7b2'
+branch_labels = None
+depends_on = None
+
+
+from app.core.config import settings
+
+def upgrade() -> None:
+    # get_map_photos: a user's live, geotagged photos for one provider
+    try:
+        op.create_index('idx_photos_user_provider_gps', 'photos', ['user_id', 'storage_provider'], unique=False, schema=settings.DB_SCHEMA, postgresql_where='deleted_at IS NULL AND gps_lat IS NOT NULL AND gps_lng IS NOT NULL')
+    except Exception:
+        pass
+
+
+def downgrade() -> None:
+    op.drop_index('idx_photos_user_provider_gps', table_name='photos', schema=settings.DB_SCHEMA)
@@ -0,0 +1,30 @@
+"""add index for animal photo count
+
+Revision ID: e66e11abb0d5
+Revises: add_pipeline_monitoring
+Create Date: 2026-10-17 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e66e11abb0d5'
+down_revision = 'add_pipeline_monitoring'
+branch_labels = None
+depends_on = None
+
+
+from app.core.config import settings
+
+def upgrade() -> None:
+    # COUNT(DISTINCT photo_id) per animal becomes an index-only scan
+    try:
+        op.create_index('ix_animal_detections_animal_photo', 'animal_detections', ['animal_id', 'photo_id'], unique=False, schema=settings.DB_SCHEMA)
+    except Exception:
+        pass
+
+
+def downgrade() -> None:
+    op.drop_index('ix_animal_detections_animal_photo', table_name='animal_detections', schema=settings.DB_SCHEMA)
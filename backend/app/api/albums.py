@@ -2,11 +2,14 @@
 Albums API endpoints for CRUD operations.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, or_
+from sqlalchemy import select, delete, or_, any_, bindparam, cast, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+import uuid
 
 from app.core.database import get_db
 from app.api.auth import get_current_user
@@ -14,17 +17,18 @@ from app.models.user import User
 from app.models.album import Album, album_photos, album_contributors
 from app.models.photo import Photo
 from app.services.storage_factory import get_storage_service
+from app.services.presigner import THUMB_NAMES, photo_url_keys
 from app.core.config import settings
 from sqlalchemy.orm import selectinload
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Pydantic schemas
 class ContributorRequest(BaseModel):
     email: str
 
 class ContributorResponse(BaseModel):
-    user_id: str
+    user_id: uuid.UUID
     full_name: str
     email: str
     
@@ -44,12 +48,12 @@ class AlbumUpdate(BaseModel):
 
 
 class AlbumResponse(BaseModel):
-    album_id: str
+    album_id: uuid.UUID
     name: str
     description: Optional[str]
-    cover_photo_id: Optional[str]
+    cover_photo_id: Optional[uuid.UUID]
     cover_photo_url: Optional[str] = None
-    thumbnail_ids: List[str] = [] # Deprecated but kept for compatibility if needed
+    thumbnail_ids: List[uuid.UUID] = [] # Deprecated but kept for compatibility if needed
     thumbnail_urls: List[str] = []
     photo_count: int
     created_at: datetime
@@ -106,10 +110,10 @@ async def create_album(
         cover_url = storage.generate_presigned_url(key)
 
     return AlbumResponse(
-        album_id=str(new_album.album_id),
+        album_id=new_album.album_id,
         name=new_album.name,
         description=new_album.description,
-        cover_photo_id=str(new_album.cover_photo_id) if new_album.cover_photo_id else None,
+        cover_photo_id=new_album.cover_photo_id,
         cover_photo_url=cover_url,
         photo_count=0,
         created_at=new_album.created_at,
@@ -124,8 +128,6 @@ async def list_albums(
     db: AsyncSession = Depends(get_db)
 ):
     """Get all albums for current user (owned + shared)."""
-    from sqlalchemy import func, and_
-    
     # 1. Fetch albums (Owned only - Shared moved to /sharing/inbox)
     result = await db.execute(
         select(Album)
@@ -153,49 +155,8 @@ async def list_albums(
     count_result = await db.execute(count_stmt)
     counts_map = {row[0]: row[1] for row in count_result.all()}
     
-    # 3. Bulk fetch thumbnails using window function (Top 3 per album)
-    # Subquery to assign row numbers partition by album
-    subq = (
-        select(
-            album_photos.c.album_id, 
-            album_photos.c.photo_id,
-            func.row_number().over(
-                partition_by=album_photos.c.album_id,
-                order_by=album_photos.c.added_at.desc()
-            ).label("rn")
-        )
-        .where(album_photos.c.album_id.in_(album_ids))
-        .subquery()
-    )
-    
-    # Filter where row number <= 3
-    thumb_stmt = (
-        select(subq.c.album_id, subq.c.photo_id)
-        .where(subq.c.rn <= 3)
-    )
-    thumb_result = await db.execute(thumb_stmt)
-    
-    # Group thumbnails by album
-    thumbs_map = {aid: [] for aid in album_ids}
-    for row in thumb_result.all():
-        thumbs_map[row[0]].append(str(row[1]))
-    
-    # Generate Signed URLs
-    storage = get_storage_service()
-    
-    # Need to know uploader for each photo to sign url? 
-    # Current limitation: thumbnails are stored as uploads/{owner_id}/{photo_id}.
-    # The Album List query for thumbnails gives us Photo IDs.
-    # WE DO NOT KNOW the user_id of the photo from the bulk query above!
-    # The current `sign_thumb` function uses `current_user.user_id`.
-    # THIS IS A BUG for shared albums! If I see a shared album, the cover photo might not be mine.
-    # The thumbnails might not be mine.
-    
-    # Fix: We need to fetch the user_id (owner) for the thumbnails.
-    # I should change the thumb_stmt to join with photos table and fetch user_id.
-    
-    # Redoing step 3 to include photo owner.
-    
+    # 3. Bulk fetch thumbnails using window function (Top 3 per album), with each
+    # photo's owner: thumbnails live under the uploader's prefix, not the viewer's
     subq_owner = (
         select(
             album_photos.c.album_id, 
@@ -222,73 +183,41 @@ async def list_albums(
     for row in thumb_result_owner.all():
         # row: album_id, photo_id, photo_owner_id
         thumbs_info_map[row[0]].append({
-            "id": str(row[1]),
-            "owner_id": str(row[2])
+            "id": row[1],
+            "owner_id": row[2]
         })
 
+    # Generate Signed URLs
+    storage = get_storage_service()
 
     def sign_thumb_with_owner(photo_id, owner_id, size=512):
          key = f"{settings.STORAGE_PATH_PREFIX}/{owner_id}/{photo_id}/thumbnails/thumb_{size}.jpg"
          return storage.generate_presigned_url(key, expires_in=86400)
 
     # 4. Assemble response
-    album_responses = []
-    
-    # Also need to handle Album Cover Photo Owner!
-    # The album object has cover_photo_id. We lazy loaded it? No.
-    # We should eager load cover_photo.
-    # To fix cover photo URL, we need to fetch cover photo details or Preload it.
-    
-    # Let's optimize step 1 to preload cover_photo
-    # I'll rely on a separate specific fix or efficient query if possible.
-    # For now, let's assume cover photo is likely one of the thumbnails or we need to fetch it.
-    # The simplest way to avoid N+1 is `selectinload(Album.cover_photo)`.
-    
-    # I will modify Step 1 in a separate small edit if needed, or assume I can't change it here easily without re-writing the whole block.
-    # Wait, I AM rewriting the whole block. I should add `selectinload(Album.cover_photo)`.
-    
-    for album in albums:
-        # Cover photo
-        cover_url = None
-        if album.cover_photo:
-             # If we preloaded it
-             cover_url = sign_thumb_with_owner(album.cover_photo_id, album.cover_photo.user_id, 512)
-        elif album.cover_photo_id:
-             # Fallback if not loaded (though we should load it)
-             # Try to find owner in thumbs if it happens to be there?
-             # Or assume current user (risky). 
-             # Let's rely on preloading `cover_photo` in the query.
-             pass
-            
-        # Thumbnails list
+    # Server-sourced data: return the response directly, so response_model only
+    # documents the shape and nothing is re-validated or run through jsonable_encoder
+    def build_album_response(album):
         t_infos = thumbs_info_map.get(album.album_id, [])
-        t_ids = [t['id'] for t in t_infos]
-        t_urls = [sign_thumb_with_owner(t['id'], t['owner_id'], 512) for t in t_infos]
-        
-        # Contributors mapping
-        contrib_list = [
-            ContributorResponse(
-                user_id=str(c.user_id),
-                full_name=c.full_name,
-                email=c.email
-            ) for c in album.contributors
-        ]
-        
-        album_responses.append(AlbumResponse(
-            album_id=str(album.album_id),
-            name=album.name,
-            description=album.description,
-            cover_photo_id=str(album.cover_photo_id) if album.cover_photo_id else None,
-            cover_photo_url=cover_url,
-            thumbnail_ids=t_ids,
-            thumbnail_urls=t_urls,
-            photo_count=counts_map.get(album.album_id, 0),
-            created_at=album.created_at,
-            updated_at=album.updated_at,
-            contributors=contrib_list
-        ))
-    
-    return album_responses
+        return {
+            "album_id": str(album.album_id),
+            "name": album.name,
+            "description": album.description,
+            "cover_photo_id": str(album.cover_photo_id) if album.cover_photo_id else None,
+            # Cover photo owner comes from the preloaded `cover_photo` relationship
+            "cover_photo_url": sign_thumb_with_owner(album.cover_photo_id, album.cover_photo.user_id, 512) if album.cover_photo else None,
+            "thumbnail_ids": [str(t['id']) for t in t_infos],
+            "thumbnail_urls": [sign_thumb_with_owner(t['id'], t['owner_id'], 512) for t in t_infos],
+            "photo_count": counts_map.get(album.album_id, 0),
+            "created_at": album.created_at,
+            "updated_at": album.updated_at,
+            "contributors": [
+                {"user_id": str(c.user_id), "full_name": c.full_name, "email": c.email}
+                for c in album.contributors
+            ]
+        }
+
+    return ORJSONResponse([build_album_response(album) for album in albums])
 
 
 # Get album details
@@ -322,66 +251,65 @@ async def get_album(
     
     is_owner = (album.user_id == current_user.user_id)
 
-    # Get photos in album
-    # Need to join with Photo.user to get photo owner name
+    # Get photos in album, with the owner's name joined in so each row is a flat tuple
     photos_result = await db.execute(
-        select(Photo)
+        select(
+            Photo.photo_id,
+            Photo.user_id,
+            Photo.filename,
+            Photo.mime_type,
+            Photo.size_bytes,
+            Photo.uploaded_at,
+            Photo.favorite,
+            Photo.caption,
+            Photo.taken_at,
+            User.full_name,
+        )
         .join(album_photos, Photo.photo_id == album_photos.c.photo_id)
-        .options(selectinload(Photo.user))
+        .outerjoin(User, User.user_id == Photo.user_id)
         .where(album_photos.c.album_id == album.album_id)
         .order_by(album_photos.c.added_at.desc())
     )
-    photos = photos_result.scalars().all()
     
     # Generate Signed URLs
     storage = get_storage_service()
     
-    def sign_b2_url(key: str) -> str:
-        return storage.generate_presigned_url(key, expires_in=86400)
+    def sign_thumbs(owner_id, photo_id, filename: str) -> dict:
+        return {
+            name: storage.generate_presigned_url(key, expires_in=86400)
+            for name, key in zip(THUMB_NAMES, photo_url_keys(owner_id, photo_id, filename))
+        }
 
-    photos_data = []
-    for p in photos:
-        # Photo owner
-        p_owner_id = p.user_id
-        p_owner_name = p.user.full_name if p.user else "Unknown"
-        
-        key_base = f"{settings.STORAGE_PATH_PREFIX}/{p_owner_id}/{p.photo_id}"
-        thumb_urls = {
-            "thumb_256": sign_b2_url(f"{key_base}/thumbnails/thumb_256.jpg"),
-            "thumb_512": sign_b2_url(f"{key_base}/thumbnails/thumb_512.jpg"),
-            "thumb_1024": sign_b2_url(f"{key_base}/thumbnails/thumb_1024.jpg"),
-            "original": sign_b2_url(f"{key_base}/original/{p.filename}")
+    photos_data = [
+        {
+            "photo_id": pid,
+            "filename": filename,
+            "mime_type": mime_type,
+            "size_bytes": size_bytes,
+            "uploaded_at": uploaded_at,
+            "favorite": favorite,
+            "thumb_urls": sign_thumbs(owner_id, pid, filename),
+            "caption": caption,
+            "taken_at": taken_at,
+            "owner": {"user_id": owner_id, "name": owner_name or "Unknown"},
         }
-        
-        photos_data.append({
-            "photo_id": str(p.photo_id),
-            "filename": p.filename,
-            "mime_type": p.mime_type,
-            "size_bytes": p.size_bytes,
-            "uploaded_at": p.uploaded_at.isoformat(),
-            "favorite": p.favorite,
-            "thumb_urls": thumb_urls,
-            "caption": p.caption, 
-            "taken_at": p.taken_at,
-            "owner": {
-                "user_id": str(p_owner_id),
-                "name": p_owner_name
-            }
-        })
+        for pid, owner_id, filename, mime_type, size_bytes, uploaded_at, favorite, caption, taken_at, owner_name
+        in photos_result.all()
+    ]
     
     contrib_list = [
         ContributorResponse(
-            user_id=str(c.user_id),
+            user_id=c.user_id,
             full_name=c.full_name,
             email=c.email
         ) for c in album.contributors
     ]
 
     return AlbumDetailResponse(
-        album_id=str(album.album_id),
+        album_id=album.album_id,
         name=album.name,
         description=album.description,
-        cover_photo_id=str(album.cover_photo_id) if album.cover_photo_id else None,
+        cover_photo_id=album.cover_photo_id,
         photo_count=len(photos_data),
         created_at=album.created_at,
         updated_at=album.updated_at,
@@ -434,10 +362,10 @@ async def update_album(
     photo_count = len(count_result.all())
     
     return AlbumResponse(
-        album_id=str(album.album_id),
+        album_id=album.album_id,
         name=album.name,
         description=album.description,
-        cover_photo_id=str(album.cover_photo_id) if album.cover_photo_id else None,
+        cover_photo_id=album.cover_photo_id,
         photo_count=photo_count,
         created_at=album.created_at,
         updated_at=album.updated_at
@@ -466,43 +394,65 @@ async def add_contributor(
             detail="Album not found or you are not the owner"
         )
     
-    # 2. Find user by email
-    user_result = await db.execute(select(User).where(User.email == contributor.email))
-    user_to_add = user_result.scalar_one_or_none()
+    # 2. Resolve the user by email and insert the contributor row in a single
+    # INSERT ... SELECT. ON CONFLICT DO NOTHING covers the "already a contributor"
+    # case, and the outer SELECT reports the user plus whether a row was inserted.
+    target = (
+        select(User.user_id, User.full_name, User.email)
+        .where(User.email == contributor.email)
+        .cte("target")
+    )
+    inserted = (
+        pg_insert(album_contributors)
+        .from_select(
+            ["album_id", "user_id", "role", "joined_at"],
+            select(
+                literal(album.album_id),
+                target.c.user_id,
+                literal("contributor"),
+                literal(datetime.utcnow())
+            ).where(target.c.user_id != current_user.user_id)
+        )
+        .on_conflict_do_nothing()
+        .returning(album_contributors.c.user_id)
+        .cte("inserted")
+    )
+    insert_result = await db.execute(
+        select(
+            target.c.user_id,
+            target.c.full_name,
+            target.c.email,
+            select(func.count()).select_from(inserted).scalar_subquery().label("inserted")
+        )
+    )
+    row = insert_result.one_or_none()
     
-    if not user_to_add:
+    if not row:
         raise HTTPException(status_code=404, detail="User with this email not found")
         
-    if user_to_add.user_id == current_user.user_id:
+    if row.user_id == current_user.user_id:
         raise HTTPException(status_code=400, detail="You are the owner")
 
-    # 3. Check if already contributor
-    if user_to_add in album.contributors:
+    if not row.inserted:
         raise HTTPException(status_code=400, detail="User is already a contributor")
         
-    # 4. Add contributor
-    # Insert directly into association table or append to relationship
-    # Since we loaded contributors, appending might work but inserting to table is safer/explicit
-    # import uuid if needed, or use values
-    # album.contributors.append(user_to_add) # This should work with async session if properly managed, but explicit INSERT preferred for massive concurency or clarity
-    
-    # Using append with selectinload works fine in SQLAlchemy 2.0+ async usually, but let's be explicit
-    stmt = album_contributors.insert().values(
-        album_id=album.album_id,
-        user_id=user_to_add.user_id
-    )
-    await db.execute(stmt)
     await db.commit()
     
-    # Reload contributors for response
-    await db.refresh(album, attribute_names=["contributors"])
-    
+    # Contributors were preloaded above, so answer from memory plus the new row
+    # instead of refreshing the relationship. (Appending to album.contributors
+    # would make the unit of work insert the association row a second time.)
     return [
         ContributorResponse(
-            user_id=str(c.user_id),
+            user_id=c.user_id,
             full_name=c.full_name,
             email=c.email
         ) for c in album.contributors
+    ] + [
+        ContributorResponse(
+            user_id=row.user_id,
+            full_name=row.full_name,
+            email=row.email
+        )
     ]
 
 
@@ -561,9 +511,16 @@ async def add_photos_to_album(
 
     # Verify photos exist and belong to user
     # Simplified check: just fetch them
+    # Bind the ids as a single uuid[] parameter (= ANY) rather than an IN list whose
+    # length varies per request, so the statement text stays stable and cacheable.
+    try:
+        requested_ids = [uuid.UUID(pid) for pid in photo_ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid photo id")
+
     photos_result = await db.execute(
         select(Photo.photo_id).where(
-            Photo.photo_id.in_(photo_ids),
+            Photo.photo_id == any_(cast(bindparam("photo_ids", requested_ids), ARRAY(UUID(as_uuid=True)))),
             Photo.user_id == current_user.user_id
         )
     )
@@ -581,13 +538,13 @@ async def add_photos_to_album(
     existing_result = await db.execute(
         select(album_photos.c.photo_id).where(
             album_photos.c.album_id == album_id,
-            album_photos.c.photo_id.in_(valid_photo_ids)
+            album_photos.c.photo_id == any_(cast(bindparam("valid_ids", list(valid_photo_ids)), ARRAY(UUID(as_uuid=True))))
         )
     )
-    existing_ids = set(str(pid) for pid in existing_result.scalars().all())
+    existing_ids = set(existing_result.scalars().all())
     
     # Filter out already added
-    new_ids = [pid for pid in valid_photo_ids if str(pid) not in existing_ids]
+    new_ids = [pid for pid in valid_photo_ids if pid not in existing_ids]
     
     if new_ids:
         values = [{"album_id": album_id, "photo_id": pid, "added_at": datetime.utcnow()} for pid in new_ids]
@@ -600,32 +557,6 @@ async def add_photos_to_album(
     return {"added_count": len(new_ids), "existing_count": len(existing_ids)}
 
 
-@router.delete("/{album_id}/photos/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_photo_from_album(
-    album_id: str,
-    photo_id: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """Remove a photo from an album."""
-    # Verify album ownership
-    result = await db.execute(
-        select(Album).where(Album.album_id == album_id, Album.user_id == current_user.user_id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Album not found")
-        
-    # Delete from junction table
-    await db.execute(
-        delete(album_photos).where(
-            album_photos.c.album_id == album_id,
-            album_photos.c.photo_id == photo_id
-        )
-    )
-    await db.commit()
-
-
-
 # Add photo to album
 @router.post("/{album_id}/photos/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def add_photo_to_album(
@@ -677,7 +608,6 @@ async def add_photo_to_album(
         return  # Already in album, just return success
     
     # Add to album
-    import uuid
     await db.execute(
         album_photos.insert().values(
             album_id=uuid.UUID(album_id),
@@ -711,7 +641,6 @@ async def remove_photo_from_album(
         )
     
     # Remove from album
-    import uuid
     await db.execute(
         delete(album_photos).where(
             album_photos.c.album_id == uuid.UUID(album_id),
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, update, exists, func, desc
+from sqlalchemy.orm import load_only
 from typing import List, Optional, Any
 import uuid
 
@@ -8,13 +10,13 @@ from app.core.database import get_db
 from app.models.user import User
 from app.models.animal import Animal, AnimalDetection
 from app.models.photo import Photo
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, get_bearer_user_id, user_is_active
 from app.services.animal_clustering import cluster_animals
-from app.services.storage_factory import get_storage_service
+from app.services.presigner import get_presigner, sign_photo_urls
 from app.core.config import settings
 from pydantic import BaseModel
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 class AnimalResponse(BaseModel):
     animal_id: uuid.UUID
@@ -35,10 +37,34 @@ class PhotoResponse(BaseModel):
     taken_at: Optional[Any] = None
 
 
+def _photo_count():
+    """
+    Correlated COUNT(DISTINCT photo_id) for the Animal row in the enclosing statement,
+    so an animal and its count come back in one round trip.
+    """
+    return (
+        select(func.count(func.distinct(AnimalDetection.photo_id)))
+        .where(AnimalDetection.animal_id == Animal.animal_id)
+        .correlate(Animal)
+        .scalar_subquery()
+    )
+
+
+async def _sign_cover(user_id, cover_detection_id) -> Optional[str]:
+    """Signed URL for an animal's cover crop, or None if it has no cover."""
+    if not cover_detection_id:
+        return None
+    [url] = await get_presigner().sign(
+        [f"{settings.STORAGE_PATH_PREFIX}/{user_id}/animals/crops/{cover_detection_id}.jpg"],
+        expires_in=3600
+    )
+    return url
+
+
 
 @router.get("", response_model=List[AnimalResponse])
 async def list_animals(
-    current_user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_bearer_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """List all animal groups found for the user."""
@@ -48,7 +74,8 @@ async def list_animals(
             func.count(func.distinct(AnimalDetection.photo_id)).label("photo_count")
         )
         .join(AnimalDetection, AnimalDetection.animal_id == Animal.animal_id)
-        .where(Animal.user_id == current_user.user_id)
+        .options(load_only(Animal.animal_id, Animal.name, Animal.cover_detection_id))
+        .where(Animal.user_id == user_id, user_is_active(user_id))
         .group_by(Animal.animal_id)
         .order_by(desc("photo_count"))
     )
@@ -56,76 +83,66 @@ async def list_animals(
     result = await db.execute(stmt)
     animals_with_counts = result.all()
     
-    response = []
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-
-    for animal, count in animals_with_counts:
-        cover_url = None
-        if animal.cover_detection_id:
-            # We assume the crop exists in storage
-            cover_url = storage.generate_presigned_url(
-                f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/animals/crops/{animal.cover_detection_id}.jpg",
-                expires_in=3600
-            )
-            
-        response.append(AnimalResponse(
-            animal_id=animal.animal_id,
-            name=animal.name,
-            count=count,
-            cover_photo_url=cover_url
-        ))
-        
-    return response
+    # Sign all cover crops in one batch
+    cover_ids = [animal.cover_detection_id for animal, _ in animals_with_counts if animal.cover_detection_id]
+    crops_prefix = f"{settings.STORAGE_PATH_PREFIX}/{user_id}/animals/crops/"
+    cover_urls = dict(zip(cover_ids, await get_presigner().sign(
+        [crops_prefix + str(cid) + ".jpg" for cid in cover_ids],
+        expires_in=3600
+    )))
+
+    # Server-sourced data: return the response directly, so response_model only
+    # documents the shape and nothing is re-validated
+    return ORJSONResponse([
+        {
+            "animal_id": str(animal.animal_id),
+            "name": animal.name,
+            "count": count,
+            "cover_photo_url": cover_urls.get(animal.cover_detection_id)
+        }
+        for animal, count in animals_with_counts
+    ])
 
 @router.get("/{animal_id}", response_model=AnimalResponse)
 async def get_animal(
     animal_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_bearer_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
-        select(Animal).where(Animal.animal_id == animal_id, Animal.user_id == current_user.user_id)
+        select(Animal, _photo_count().label("photo_count"))
+        .where(Animal.animal_id == animal_id, Animal.user_id == user_id, user_is_active(user_id))
     )
-    animal = result.scalar_one_or_none()
-    if not animal:
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Animal not found")
-        
-    count_res = await db.execute(
-        select(func.count(func.distinct(AnimalDetection.photo_id))).where(AnimalDetection.animal_id == animal_id)
-    )
-    count = count_res.scalar()
+    animal, count = row
     
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-    cover_url = None
-    if animal.cover_detection_id:
-        cover_url = storage.generate_presigned_url(
-            f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/animals/crops/{animal.cover_detection_id}.jpg",
-            expires_in=3600
-        )
-
     return AnimalResponse(
         animal_id=animal.animal_id,
         name=animal.name,
         count=count,
-        cover_photo_url=cover_url
+        cover_photo_url=await _sign_cover(user_id, animal.cover_detection_id)
     )
 
 @router.get("/{animal_id}/photos")
 async def list_animal_photos(
     animal_id: uuid.UUID,
-    current_user: User = Depends(get_current_user),
+    user_id: uuid.UUID = Depends(get_bearer_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """List all photos containing the specified animal."""
-    # Verify animal exists
+    # Verify animal exists (index probe only)
     result = await db.execute(
-        select(Animal).where(Animal.animal_id == animal_id, Animal.user_id == current_user.user_id)
+        select(exists().where(Animal.animal_id == animal_id, Animal.user_id == user_id))
+        .where(user_is_active(user_id))
     )
-    if not result.scalar_one_or_none():
+    if not result.scalar():
         raise HTTPException(status_code=404, detail="Animal not found")
 
+    # Only the columns the response uses; no Photo entities to hydrate
     stmt = (
-        select(Photo)
+        select(Photo.photo_id, Photo.filename, Photo.taken_at)
         .distinct()
         .join(AnimalDetection, AnimalDetection.photo_id == Photo.photo_id)
         .where(
@@ -136,28 +153,18 @@ async def list_animal_photos(
     )
     
     result = await db.execute(stmt)
-    photos = result.scalars().all()
+    rows = result.all()
     
-    response = []
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-
-    for photo in photos:
-        key_base = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-        thumb_urls = {
-            "thumb_256": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_256.jpg", expires_in=3600),
-            "thumb_512": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_512.jpg", expires_in=3600),
-            "thumb_1024": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_1024.jpg", expires_in=3600),
-            "original": storage.generate_presigned_url(f"{key_base}/original/{photo.filename}", expires_in=3600)
-        }
-        
-        response.append({
-            "photo_id": str(photo.photo_id),
-            "filename": photo.filename,
+    all_thumb_urls = await sign_photo_urls(rows, user_id)
+    return [
+        {
+            "photo_id": str(photo_id),
+            "filename": filename,
             "thumb_urls": thumb_urls,
-            "taken_at": photo.taken_at
-        })
-        
-    return response
+            "taken_at": taken_at
+        }
+        for (photo_id, filename, taken_at), thumb_urls in zip(rows, all_thumb_urls)
+    ]
 
 @router.patch("/{animal_id}", response_model=AnimalResponse)
 async def update_animal(
@@ -166,15 +173,21 @@ async def update_animal(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    # Ownership check, rename and response data in one UPDATE ... RETURNING
     result = await db.execute(
-        select(Animal).where(Animal.animal_id == animal_id, Animal.user_id == current_user.user_id)
+        update(Animal)
+        .where(Animal.animal_id == animal_id, Animal.user_id == current_user.user_id)
+        .values(name=data.name)
+        .returning(Animal.animal_id, Animal.name, Animal.cover_detection_id, _photo_count().label("photo_count"))
     )
-    animal = result.scalar_one_or_none()
-    if not animal:
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Animal not found")
-        
-    animal.name = data.name
     await db.commit()
-    await db.refresh(animal)
     
-    return await get_animal(animal.animal_id, current_user, db)
+    return AnimalResponse(
+        animal_id=row.animal_id,
+        name=row.name,
+        count=row.photo_count,
+        cover_photo_url=await _sign_cover(current_user.user_id, row.cover_detection_id)
+    )
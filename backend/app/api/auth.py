@@ -2,32 +2,92 @@
 Authentication API endpoints.
 Implements register, login, and JWT refresh.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query, Header, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, exists, update, func, or_, case
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+import asyncio
 import hashlib
+import logging
+import re
+import threading
+import time
 import uuid
-from jose import jwt, JWTError
+from google.oauth2 import id_token
+from google.auth.transport import requests as google_requests
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.core.security import (
-    verify_password,
     get_password_hash,
+    averify_and_update_password,
+    aget_password_hash,
     create_access_token,
     create_refresh_token,
-    decode_token
+    decode_token,
+    decode_token_cached,
+    decode_token_user_id
 )
+from app.core.user_cache import get_user_cached, invalidate_user
 from app.models.user import User
 from app.models.photo import Photo
-from sqlalchemy import func
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 security = HTTPBearer()
 
+# Verified against when the account is missing or has no password, so those
+# logins cost the same hashing work as a wrong password
+_DUMMY_PASSWORD_HASH = get_password_hash("photobomb-timing-dummy")
+
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+_BEARER_RE = re.compile(r"^Bearer\s+(\S+)$", re.IGNORECASE)
+
+
+def _bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Token from an 'Authorization: Bearer <token>' header, or None if it isn't one."""
+    match = _BEARER_RE.match(authorization or "")
+    return match.group(1) if match else None
+
+
+class _CachingGoogleRequest:
+    """
+    google-auth transport that caches GET responses for their Cache-Control max-age.
+    verify_oauth2_token fetches Google's signing certs on every call; those change
+    rarely and are served with a long max-age, so reuse them across logins.
+    """
+
+    def __init__(self):
+        self._request = google_requests.Request()
+        self._cache = {}  # url -> (expires_at, response)
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=120, **kwargs):
+        if method != "GET" or body is not None:
+            return self._request(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+        
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        response = self._request(url, method=method, headers=headers, timeout=timeout, **kwargs)
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        if response.status == 200 and match:
+            # Touch data now so the cached response has its body loaded
+            response.data
+            with self._lock:
+                self._cache[url] = (now + int(match.group(1)), response)
+        return response
+
+
+_google_request = _CachingGoogleRequest()
+
 
 # Pydantic schemas
 class RegisterRequest(BaseModel):
@@ -61,14 +121,12 @@ class RefreshRequest(BaseModel):
     refresh_token: str
 
 
-# Dependency to get current user from JWT
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """Extract user from JWT access token."""
-    token = credentials.credentials
-    payload = decode_token(token)
+async def _user_from_token(token: str, db: AsyncSession) -> User:
+    """
+    Resolve an access token to its active user, raising 401 otherwise.
+    Shared by the header and query-param auth dependencies so both hit the same caches.
+    """
+    payload = decode_token_cached(token)
     
     if not payload:
         raise HTTPException(
@@ -83,11 +141,8 @@ async def get_current_user(
             detail="Invalid token payload"
         )
     
-    # Fetch user from database
-    result = await db.execute(select(User).where(User.user_id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user or user.deleted_at:
+    user = await get_user_cached(db, user_id)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
@@ -96,17 +151,27 @@ async def get_current_user(
     return user
 
 
+# Dependency to get current user from JWT
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Extract user from JWT access token."""
+    return await _user_from_token(credentials.credentials, db)
+
+
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
 async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
     """
     Register a new user account.
     Returns JWT tokens immediately after registration.
     """
-    # Check if email already exists
-    result = await db.execute(select(User).where(User.email == request.email))
-    existing_user = result.scalar_one_or_none()
+    # Check if email already exists (index probe on the unique email index)
+    result = await db.execute(
+        select(User.user_id).where(User.email == request.email).limit(1)
+    )
     
-    if existing_user:
+    if result.scalar() is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email already registered"
@@ -115,7 +180,7 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     # Create new user
     user = User(
         email=request.email,
-        password_hash=get_password_hash(request.password),
+        password_hash=await aget_password_hash(request.password),
         full_name=request.full_name
     )
     
@@ -150,19 +215,14 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == request.email))
     user = result.scalar_one_or_none()
     
-    if not user or not user.password_hash:
-        # Delay response to prevent timing attacks
-        import asyncio
-        await asyncio.sleep(0.2)
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid email or password"
-        )
+    # Always run one password verify, whether or not the account exists
+    has_password = bool(user and user.password_hash)
+    password_ok, new_hash = await averify_and_update_password(
+        request.password,
+        user.password_hash if has_password else _DUMMY_PASSWORD_HASH
+    )
     
-    # Verify password
-    if not verify_password(request.password, user.password_hash):
-        import asyncio
-        await asyncio.sleep(0.2)
+    if not (has_password and password_ok):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -175,6 +235,11 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
             detail="Account has been deleted"
         )
     
+    # Upgrade legacy (bcrypt) or outdated hashes now that we have the plaintext
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    
     # Generate tokens
     access_token = create_access_token(data={
         "sub": str(user.user_id),
@@ -218,10 +283,8 @@ async def refresh_token_endpoint(request: RefreshRequest, db: AsyncSession = Dep
         )
     
     # Verify user exists
-    result = await db.execute(select(User).where(User.user_id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user or user.deleted_at:
+    user = await get_user_cached(db, user_id)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
@@ -253,14 +316,12 @@ async def google_login(
     Login or register with Google OAuth.
     Verifies Google ID token and creates/updates user.
     """
-    from google.oauth2 import id_token
-    from google.auth.transport import requests as google_requests
-    
     try:
-        # Verify Google ID token
-        idinfo = id_token.verify_oauth2_token(
+        # Verify Google ID token (blocking: cert fetch + RSA verify) in a worker thread
+        idinfo = await asyncio.to_thread(
+            id_token.verify_oauth2_token,
             request.credential,
-            google_requests.Request(),
+            _google_request,
             settings.GOOGLE_CLIENT_ID
         )
         
@@ -269,33 +330,29 @@ async def google_login(
         email = idinfo['email']
         full_name = idinfo.get('name', email.split('@')[0])
         
-        # Check if user exists with this Google ID
+        # Look up by Google ID or email in one query, preferring the Google ID match
         result = await db.execute(
-            select(User).where(User.google_id == google_id)
+            select(User)
+            .where(or_(User.google_id == google_id, User.email == email))
+            .order_by(case((User.google_id == google_id, 0), else_=1))
+            .limit(1)
         )
         user = result.scalar_one_or_none()
         
-        if not user:
-            # Check if user exists with this email
-            result = await db.execute(
-                select(User).where(User.email == email)
+        if user and user.google_id != google_id:
+            # Link Google account to existing user
+            user.google_id = google_id
+            user.email_verified = True
+        elif not user:
+            # Create new user
+            user = User(
+                email=email,
+                google_id=google_id,
+                full_name=full_name,
+                email_verified=True,
+                password_hash=None  # No password for OAuth users
             )
-            user = result.scalar_one_or_none()
-            
-            if user:
-                # Link Google account to existing user
-                user.google_id = google_id
-                user.email_verified = True
-            else:
-                # Create new user
-                user = User(
-                    email=email,
-                    google_id=google_id,
-                    full_name=full_name,
-                    email_verified=True,
-                    password_hash=None  # No password for OAuth users
-                )
-                db.add(user)
+            db.add(user)
         
         await db.commit()
         await db.refresh(user)
@@ -323,19 +380,43 @@ async def google_login(
         
     except ValueError as e:
         # Invalid token
-        print(f"DEBUG: Google token verification failed: {str(e)}")
+        logger.warning("Google token verification failed", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid Google token: {str(e)}"
         )
 
 
+async def reconcile_storage_usage(user_id: uuid.UUID) -> None:
+    """
+    Recompute users.storage_used_bytes from the photos table.
+    Single UPDATE that only writes when the stored value has drifted.
+    """
+    used = (
+        select(func.coalesce(func.sum(Photo.size_bytes), 0).label("total"))
+        .where(Photo.user_id == user_id)
+        .subquery()
+    )
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(User)
+                .where(User.user_id == user_id, User.storage_used_bytes.is_distinct_from(used.c.total))
+                .values(storage_used_bytes=used.c.total)
+            )
+            await db.commit()
+        invalidate_user(user_id)
+    except Exception as e:
+        logger.warning("Failed to reconcile storage usage for %s: %s", user_id, e)
+
+
 @router.get("/me")
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
 ):
-    """Get current authenticated user information and sync storage usage."""
+    """Get current authenticated user information and sync storage usage in the background."""
+    background_tasks.add_task(reconcile_storage_usage, current_user.user_id)
     
     return {
         "user_id": str(current_user.user_id),
@@ -357,22 +438,40 @@ async def get_current_user_id(
     """
     token_str = token
     if not token_str and authorization:
-         if authorization.startswith("Bearer "):
-             token_str = authorization.split(" ")[1]
-         else:
-             token_str = authorization
+        # A bare token (no scheme) is accepted too
+        token_str = _bearer_token(authorization) or authorization
              
     if not token_str:
         raise HTTPException(status_code=401, detail="Not authenticated")
         
-    payload = decode_token(token_str)
-    if not payload or not payload.get("sub"):
+    user_id = decode_token_user_id(token_str)
+    if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-        
-    try:
-        return uuid.UUID(payload.get("sub"))
-    except ValueError:
-         raise HTTPException(status_code=401, detail="Invalid token subject")
+    
+    return user_id
+
+
+async def get_bearer_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> uuid.UUID:
+    """
+    Get user_id from the Bearer token WITHOUT DB lookup.
+    Endpoints using this must check the account in their own query,
+    e.g. `.where(user_is_active(user_id))`, so auth costs no extra round trip.
+    """
+    user_id = decode_token_user_id(credentials.credentials)
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token"
+        )
+    
+    return user_id
+
+
+def user_is_active(user_id: uuid.UUID):
+    """EXISTS clause: the user exists and is not soft-deleted."""
+    return exists().where(User.user_id == user_id, User.deleted_at.is_(None))
 
 
 async def get_current_user_or_token(
@@ -390,8 +489,8 @@ async def get_current_user_or_token(
     if token:
         jwt_token = token
     elif authorization:
-        scheme, _, jwt_token = authorization.partition(" ")
-        if scheme.lower() != "bearer":
+        jwt_token = _bearer_token(authorization)
+        if not jwt_token:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication scheme"
@@ -403,38 +502,7 @@ async def get_current_user_or_token(
             detail="Not authenticated"
         )
     
-    # Verify token (same logic as get_current_user)
-    try:
-        payload = jwt.decode(
-            jwt_token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token"
-        )
-    
-    # Fetch user from database
-    result = await db.execute(
-        select(User).where(User.user_id == user_id, User.deleted_at == None)
-    )
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
-    
-    return user
+    return await _user_from_token(jwt_token, db)
 
 
 async def get_optional_current_user(
@@ -449,11 +517,11 @@ async def get_optional_current_user(
         return None
         
     try:
-        scheme, _, token = authorization.partition(" ")
-        if scheme.lower() != "bearer" or not token:
+        token = _bearer_token(authorization)
+        if not token:
             return None
             
-        payload = decode_token(token)
+        payload = decode_token_cached(token)
         if not payload:
             return None
             
@@ -461,13 +529,7 @@ async def get_optional_current_user(
         if not user_id:
             return None
             
-        result = await db.execute(select(User).where(User.user_id == user_id))
-        user = result.scalar_one_or_none()
-        
-        if not user or user.deleted_at:
-            return None
-            
-        return user
+        return await get_user_cached(db, user_id)
     except Exception:
         return None
 
@@ -1,7 +1,9 @@
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
+from sqlalchemy.orm import load_only, selectinload
 from typing import List, Optional
 import uuid
 
@@ -10,11 +12,12 @@ from app.models.user import User
 from app.models.tag import Tag, PhotoTag
 from app.models.photo import Photo
 from app.api.auth import get_current_user
-from app.services.storage_factory import get_storage_service
+from app.api.photos import PhotoResponse, _photo_item
+from app.services.presigner import THUMB_SUFFIXES, get_presigner, sign_photo_urls
 from app.core.config import settings
 from pydantic import BaseModel
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 class HashtagResponse(BaseModel):
     tag_id: uuid.UUID
@@ -31,10 +34,17 @@ async def list_hashtags(
     db: AsyncSession = Depends(get_db)
 ):
     """List all tags in the 'documents' category with photo counts."""
-    stmt = (
+    # One pass over the user's tagged photos: per-tag count plus the latest photo as cover
+    ranked = (
         select(
-            Tag,
-            func.count(PhotoTag.photo_id).label("photo_count")
+            Tag.tag_id,
+            Tag.name,
+            Photo.photo_id.label("cover_photo_id"),
+            func.count().over(partition_by=Tag.tag_id).label("photo_count"),
+            func.row_number().over(
+                partition_by=Tag.tag_id,
+                order_by=Photo.taken_at.desc().nulls_last()
+            ).label("rn")
         )
         .join(PhotoTag, PhotoTag.tag_id == Tag.tag_id)
         .join(Photo, Photo.photo_id == PhotoTag.photo_id)
@@ -43,50 +53,35 @@ async def list_hashtags(
             Photo.user_id == current_user.user_id,
             Photo.deleted_at == None
         )
-        .group_by(Tag.tag_id)
-        .order_by(desc("photo_count"))
+        .cte("ranked")
+    )
+    stmt = (
+        select(ranked.c.tag_id, ranked.c.name, ranked.c.cover_photo_id, ranked.c.photo_count)
+        .where(ranked.c.rn == 1)
+        .order_by(desc(ranked.c.photo_count))
     )
     
     result = await db.execute(stmt)
-    tags_with_counts = result.all()
-    
-    if not tags_with_counts:
-        return []
+    rows = result.all()
 
-    # BATCH QUERY for cover photos to fix N+1
-    tag_ids = [row[0].tag_id for row in tags_with_counts]
-    cover_stmt = (
-        select(PhotoTag.tag_id, Photo)
-        .join(Photo, Photo.photo_id == PhotoTag.photo_id)
-        .where(PhotoTag.tag_id.in_(tag_ids), Photo.deleted_at == None)
-        .distinct(PhotoTag.tag_id)
+    # Sign all covers in one batch
+    key_prefix = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/"
+    cover_urls = await get_presigner().sign(
+        [key_prefix + str(cover_photo_id) + THUMB_SUFFIXES[1] for _, _, cover_photo_id, _ in rows],
+        expires_in=3600
     )
-    cover_res = await db.execute(cover_stmt)
-    cover_map = {row[0]: row[1] for row in cover_res.all()}
-
-    response = []
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-
-    for tag, count in tags_with_counts:
-        cover_photo = cover_map.get(tag.tag_id)
-        
-        cover_url = None
-        if cover_photo:
-            cover_url = storage.generate_presigned_url(
-                f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{cover_photo.photo_id}/thumbnails/thumb_512.jpg",
-                expires_in=3600
-            )
-            
-        response.append(HashtagResponse(
-            tag_id=tag.tag_id,
-            name=tag.name,
-            count=count,
-            cover_photo_url=cover_url
-        ))
-        
-    return response
 
-from app.api.photos import PhotoResponse
+    # Server-sourced data: return the response directly, so response_model only
+    # documents the shape and nothing is re-validated
+    return ORJSONResponse([
+        {
+            "tag_id": str(tag_id),
+            "name": name,
+            "count": count,
+            "cover_photo_url": cover_url
+        }
+        for (tag_id, name, _, count), cover_url in zip(rows, cover_urls)
+    ])
 
 @router.get("/{tag_identifier}/photos", response_model=List[PhotoResponse])
 async def list_hashtag_photos(
@@ -101,13 +96,15 @@ async def list_hashtag_photos(
     Accepts either a UUID (tag_id) or a String (tag_name).
     """
     # 1. Determine if input is UUID or Name
+    # Names are the common case; the shape precheck skips a raise/catch for them
     target_tag_id = None
     
-    try:
-        target_tag_id = uuid.UUID(tag_identifier)
-    except ValueError:
-        # Not a UUID, treat as Name
-        pass
+    if len(tag_identifier) == 36 and tag_identifier[8] == '-' and tag_identifier[13] == '-':
+        try:
+            target_tag_id = uuid.UUID(tag_identifier)
+        except ValueError:
+            # UUID-shaped but not a UUID, treat as Name
+            pass
         
     # 2. If it's a Name, resolve to ID
     if not target_tag_id:
@@ -122,13 +119,17 @@ async def list_hashtag_photos(
             
         target_tag_id = tag_obj.tag_id
 
-    # 3. Fetch Photos using the resolved ID
-    from app.models.photo import Photo
-    from sqlalchemy.orm import selectinload
-    
+    # 3. Fetch Photos using the resolved ID (only the columns PhotoResponse uses)
     stmt = (
         select(Photo)
-        .options(selectinload(Photo.visual_tags))
+        .options(
+            load_only(
+                Photo.photo_id, Photo.filename, Photo.mime_type, Photo.size_bytes,
+                Photo.taken_at, Photo.uploaded_at, Photo.caption, Photo.favorite,
+                Photo.archived, Photo.gps_lat, Photo.gps_lng, Photo.location_name
+            ),
+            selectinload(Photo.visual_tags).load_only(Tag.name)
+        )
         .join(PhotoTag, PhotoTag.photo_id == Photo.photo_id)
         .where(
             PhotoTag.tag_id == target_tag_id,
@@ -143,43 +144,8 @@ async def list_hashtag_photos(
     result = await db.execute(stmt)
     photos = result.scalars().all()
     
-    response = []
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-    
-    # Safe float helper
-    import math
-    def safe_float(val):
-        if val is None: return None
-        try:
-            f = float(val)
-            if math.isnan(f) or math.isinf(f): return None
-            return f
-        except: return None
-
-    for photo in photos:
-        key_base = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-        thumb_urls = {
-            "thumb_256": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_256.jpg", expires_in=3600),
-            "thumb_512": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_512.jpg", expires_in=3600),
-            "thumb_1024": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_1024.jpg", expires_in=3600),
-            "original": storage.generate_presigned_url(f"{key_base}/original/{photo.filename}", expires_in=3600)
-        }
-        
-        response.append(PhotoResponse(
-            photo_id=str(photo.photo_id),
-            filename=photo.filename,
-            mime_type=photo.mime_type,
-            size_bytes=photo.size_bytes,
-            taken_at=photo.taken_at,
-            uploaded_at=photo.uploaded_at,
-            caption=photo.caption,
-            favorite=photo.favorite,
-            archived=photo.archived,
-            gps_lat=safe_float(photo.gps_lat),
-            gps_lng=safe_float(photo.gps_lng),
-            location_name=photo.location_name,
-            thumb_urls=thumb_urls,
-            tags=[t.name for t in photo.visual_tags] if hasattr(photo, 'visual_tags') else []
-        ))
-        
-    return response
+    all_thumb_urls = await sign_photo_urls(photos, current_user.user_id)
+    return ORJSONResponse([
+        _photo_item(photo, thumb_urls, [t.name for t in photo.visual_tags])
+        for photo, thumb_urls in zip(photos, all_thumb_urls)
+    ])
@@ -1,27 +1,32 @@
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, update, exists, func, desc
+from pydantic import BaseModel
 from typing import List, Optional
+import orjson
 import uuid
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.user import User
 from app.models.person import Person, Face
 from app.models.photo import Photo
 from app.api.auth import get_current_user
+from app.api.photos import PhotoResponse, _encode_cursor, _decode_cursor, _photo_item, _seek_after
 from app.services.face_clustering import cluster_faces
+from app.services.presigner import get_presigner, sign_photo_urls
+from app.core.config import settings
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
-from app.api.photos import PhotoResponse
-from sqlalchemy import desc
-from app.models.tag import PhotoTag # Ensure models are available if needed, though we use Face/Person
+# Rows fetched, signed and written per chunk when streaming a full photo listing
+_STREAM_CHUNK_ROWS = 200
 
+from app.models.tag import PhotoTag # Ensure models are available if needed, though we use Face/Person
 
-from pydantic import BaseModel
 
 class PersonResponse(BaseModel):
     person_id: uuid.UUID
@@ -36,59 +41,102 @@ class PersonUpdate(BaseModel):
     name: str
 
 
+def _face_count():
+    """
+    Correlated COUNT(DISTINCT photo_id) for the Person row in the enclosing statement,
+    so a person and its count come back in one round trip.
+    """
+    return (
+        select(func.count(func.distinct(Face.photo_id)))
+        .where(Face.person_id == Person.person_id)
+        .correlate(Person)
+        .scalar_subquery()
+    )
+
+
+def _ready_cover_id():
+    """
+    Correlated lookup of the Person's cover_face_id, NULL unless that face's crop
+    has been uploaded, so covers are gated in SQL without any storage probes.
+    """
+    return (
+        select(Face.face_id)
+        .where(Face.face_id == Person.cover_face_id, Face.crop_ready.is_(True))
+        .correlate(Person)
+        .scalar_subquery()
+    )
+
+
+async def _sign_cover(user_id, cover_face_id) -> Optional[str]:
+    """Signed URL for a person's cover face crop, or None if it has no cover."""
+    if not cover_face_id:
+        return None
+    [url] = await get_presigner().sign(
+        [f"{settings.STORAGE_PATH_PREFIX}/{user_id}/faces/{cover_face_id}.jpg"],
+        expires_in=3600
+    )
+    return url
 
-from sqlalchemy.orm import selectinload
 
 @router.get("", response_model=List[PersonResponse])
 async def list_people(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     List all people found for the user.
+    Returns everyone unless `limit` is given (then pages with `offset`).
     """
     try:
-        # Join with Face to get count, and also get cover face URL
-        
+        # Aggregate the user's faces per person first, then join the (narrow) counts
+        # to Person; the cover crop key only needs the cover's face id, when ready.
+        face_counts = (
+            select(Face.person_id, func.count(func.distinct(Face.photo_id)).label("face_count"))
+            .where(Face.person_id.in_(select(Person.person_id).where(Person.user_id == current_user.user_id)))
+            .group_by(Face.person_id)
+            .cte("face_counts")
+        )
         stmt = (
             select(
-                Person,
-                func.count(func.distinct(Face.photo_id)).label("face_count")
+                Person.person_id,
+                Person.name,
+                face_counts.c.face_count,
+                _ready_cover_id().label("cover_face_id")
             )
-            .join(Face, Face.person_id == Person.person_id)
-            .options(selectinload(Person.cover_face).selectinload(Face.photo))
+            .join(face_counts, face_counts.c.person_id == Person.person_id)
             .where(Person.user_id == current_user.user_id)
-            .group_by(Person.person_id)
-            .order_by(desc("face_count"))
+            .order_by(desc(face_counts.c.face_count), Person.person_id)
+            .limit(limit)
+            .offset(offset)
         )
         
         result = await db.execute(stmt)
         people_with_counts = result.all()
         
-        response = []
-        
-        from app.services.storage_factory import get_storage_service
-        from app.core.config import settings
-        storage = get_storage_service(settings.STORAGE_PROVIDER)
+        # Sign all cover crops in one batch (cached across requests)
+        cover_ids = [cover_face_id for *_, cover_face_id in people_with_counts if cover_face_id]
+        faces_prefix = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/faces/"
+        cover_urls = dict(zip(cover_ids, await get_presigner().sign(
+            [faces_prefix + str(fid) + ".jpg" for fid in cover_ids],
+            expires_in=3600
+        )))
 
-        for person, count in people_with_counts:
-            cover_url = None
-            cover_face = person.cover_face
-            
-            if cover_face and cover_face.photo:
-                # Use the face crop
-                key = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/faces/{cover_face.face_id}.jpg"
-                cover_url = storage.generate_presigned_url(key, expires_in=3600)
-                
-            response.append(PersonResponse(
-                person_id=person.person_id,
-                name=person.name,
-                face_count=count,
-                cover_photo_url=cover_url
-            ))
+        # Server-sourced data: build plain dicts and return the response directly, so
+        # response_model only documents the shape and nothing is re-validated
+        items = [
+            {
+                "person_id": str(person_id),
+                "name": name,
+                "face_count": count,
+                "cover_photo_url": cover_urls.get(cover_face_id)
+            }
+            for person_id, name, count, cover_face_id in people_with_counts
+        ]
             
-        logger.info(f"Successfully retrieved {len(response)} people for user {current_user.user_id}")
-        return response
+        logger.info(f"Successfully retrieved {len(items)} people for user {current_user.user_id}")
+        return ORJSONResponse(items)
     
     except Exception as e:
         logger.exception(f"Failed to list people for user {current_user.user_id}: {e}")
@@ -105,40 +153,24 @@ async def get_person(
     db: AsyncSession = Depends(get_db)
 ):
     try:
+        # Person, its photo count and cover id in one round trip
         result = await db.execute(
-            select(Person).where(Person.person_id == person_id, Person.user_id == current_user.user_id)
+            select(
+                Person.person_id, Person.name,
+                _ready_cover_id().label("cover_face_id"),
+                _face_count().label("face_count")
+            )
+            .where(Person.person_id == person_id, Person.user_id == current_user.user_id)
         )
-        person = result.scalar_one_or_none()
-        if not person:
+        row = result.one_or_none()
+        if not row:
             raise HTTPException(status_code=404, detail="Person not found")
-            
-        # Get count
-        count_res = await db.execute(select(func.count(func.distinct(Face.photo_id))).where(Face.person_id == person_id))
-        count = count_res.scalar()
-        
-        # Get cover
-        # Reuse logic...
-        from app.services.storage_factory import get_storage_service
-        from app.core.config import settings
-        storage = get_storage_service(settings.STORAGE_PROVIDER)
-        cover_url = None
-        if person.cover_face_id:
-             res = await db.execute(
-                 select(Face)
-                 .options(selectinload(Face.photo))
-                 .where(Face.face_id == person.cover_face_id)
-             )
-             cover_face = res.scalar_one_or_none()
-             if cover_face and cover_face.photo:
-                  # Use the face crop
-                  key = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/faces/{cover_face.face_id}.jpg"
-                  cover_url = storage.generate_presigned_url(key, expires_in=3600)
 
         return PersonResponse(
-            person_id=person.person_id,
-            name=person.name,
-            face_count=count,
-            cover_photo_url=cover_url
+            person_id=row.person_id,
+            name=row.name,
+            face_count=row.face_count,
+            cover_photo_url=await _sign_cover(current_user.user_id, row.cover_face_id)
         )
     
     except HTTPException:
@@ -147,14 +179,47 @@ async def get_person(
         logger.exception(f"Failed to get person {person_id} for user {current_user.user_id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve person details")
 
+async def _photo_items(photos, user_id) -> List[dict]:
+    """PhotoResponse-shaped dicts for `photos`, with all their URLs signed in one batch."""
+    all_thumb_urls = await sign_photo_urls(photos, user_id)
+    return [_photo_item(photo, thumb_urls, []) for photo, thumb_urls in zip(photos, all_thumb_urls)]
+
+
+async def _stream_photo_items(stmt, user_id, person_id):
+    """
+    Yield `stmt`'s photos as one JSON array, _STREAM_CHUNK_ROWS at a time.
+    Uses its own session: the request's get_db session is closed before the body is sent.
+    """
+    count = 0
+    yield b"["
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.stream_scalars(stmt.execution_options(yield_per=_STREAM_CHUNK_ROWS))
+            async for photos in result.partitions():
+                chunk = orjson.dumps(await _photo_items(photos, user_id))[1:-1]
+                yield (b"," if count else b"") + chunk
+                count += len(photos)
+    except Exception as e:
+        # Headers are already sent; abort the body so the client sees a failed
+        # request rather than a truncated list that parses as complete
+        logger.exception(f"Failed while streaming photos for person {person_id}: {e}")
+        raise
+    yield b"]"
+    logger.info(f"Streamed {count} photos for person {person_id}")
+
+
 @router.get("/{person_id}/photos", response_model=List[PhotoResponse])
 async def list_person_photos(
     person_id: uuid.UUID,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Pagination cursor (from X-Next-Cursor)"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    List all photos containing the specified person.
+    List all photos containing the specified person, newest first.
+    Returns every photo unless `limit` is given; then the X-Next-Cursor header
+    carries the cursor for the following page (absent on the last page).
     """
     try:
         # Verify person exists and belongs to user
@@ -165,64 +230,40 @@ async def list_person_photos(
         if not person:
             raise HTTPException(status_code=404, detail="Person not found")
 
-        # Join Face -> Photo
+        # Semi-join: a photo with several faces of this person still comes back once
         stmt = (
             select(Photo)
-            .distinct()
-            .join(Face, Face.photo_id == Photo.photo_id)
             .where(
-                Face.person_id == person_id,
-                Photo.deleted_at == None
+                Photo.deleted_at == None,
+                exists().where(Face.photo_id == Photo.photo_id, Face.person_id == person_id)
             )
-            .order_by(desc(Photo.taken_at))
+            .order_by(Photo.taken_at.desc().nulls_first(), Photo.photo_id.desc())
         )
-        
-        result = await db.execute(stmt)
+        if cursor:
+            # Keyset seek past the cursor row in (taken_at DESC NULLS FIRST, photo_id DESC) order
+            stmt = stmt.where(_seek_after(Photo.taken_at, True, *_decode_cursor(cursor)))
+        if not limit:
+            # Full listing: stream it in chunks instead of holding every row in memory
+            return StreamingResponse(
+                _stream_photo_items(stmt, current_user.user_id, person_id),
+                media_type="application/json"
+            )
+
+        # One extra row tells us whether another page exists
+        result = await db.execute(stmt.limit(limit + 1))
         photos = result.scalars().all()
         
-        response = []
-        
-        from app.services.storage_factory import get_storage_service
-        from app.core.config import settings
-        storage = get_storage_service(settings.STORAGE_PROVIDER)
-
-        # Safe float helper
-        import math
-        def safe_float(val):
-            if val is None: return None
-            try:
-                f = float(val)
-                if math.isnan(f) or math.isinf(f): return None
-                return f
-            except: return None
-
-        for photo in photos:
-            key_base = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-            
-            thumb_urls = {
-                "thumb_256": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_256.jpg", expires_in=3600),
-                "thumb_512": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_512.jpg", expires_in=3600),
-                "thumb_1024": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_1024.jpg", expires_in=3600),
-                "original": storage.generate_presigned_url(f"{key_base}/original/{photo.filename}", expires_in=3600)
-            }
-            
-            response.append(PhotoResponse(
-                photo_id=str(photo.photo_id),
-                filename=photo.filename,
-                mime_type=photo.mime_type,
-                size_bytes=photo.size_bytes,
-                taken_at=photo.taken_at,
-                uploaded_at=photo.uploaded_at,
-                caption=photo.caption,
-                favorite=photo.favorite,
-                archived=photo.archived,
-                gps_lat=safe_float(photo.gps_lat),
-                gps_lng=safe_float(photo.gps_lng),
-                location_name=photo.location_name,
-                thumb_urls=thumb_urls
-            ))
+        next_cursor = None
+        if len(photos) > limit:
+            photos = photos[:limit]
+            next_cursor = _encode_cursor(photos[-1].taken_at, photos[-1].photo_id)
         
-        logger.info(f"Retrieved {len(response)} photos for person {person_id}")
+        items = await _photo_items(photos, current_user.user_id)
+        logger.info(f"Retrieved {len(items)} photos for person {person_id}")
+        # Returned directly (no response_model re-validation of trusted dicts)
+        response = ORJSONResponse(items)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return response
     
     except HTTPException:
@@ -238,22 +279,24 @@ async def update_person(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    # Ownership check, rename and response data in one UPDATE ... RETURNING
     result = await db.execute(
-        select(Person).where(Person.person_id == person_id, Person.user_id == current_user.user_id)
+        update(Person)
+        .where(Person.person_id == person_id, Person.user_id == current_user.user_id)
+        .values(name=data.name)
+        .returning(
+            Person.person_id, Person.name,
+            _ready_cover_id().label("cover_face_id"), _face_count().label("face_count")
+        )
     )
-    person = result.scalar_one_or_none()
-    if not person:
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Person not found")
-        
-    person.name = data.name
     await db.commit()
-    await db.refresh(person)
     
-    # Re-fetch for response (count etc) - lazy hack, just return what we have with 0 count or separate query?
-    # Or just generic response.
     return PersonResponse(
-        person_id=person.person_id,
-        name=person.name,
-        face_count=0, # TODO: fetch
-        cover_photo_url=None # TODO: fetch
+        person_id=row.person_id,
+        name=row.name,
+        face_count=row.face_count,
+        cover_photo_url=await _sign_cover(current_user.user_id, row.cover_face_id)
     )
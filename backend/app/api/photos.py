@@ -2,33 +2,202 @@
 Photos API endpoints for CRUD operations.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Response, BackgroundTasks
-from fastapi.responses import Response
+from fastapi.responses import Response, ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, update, delete
+from sqlalchemy import select, desc, update, delete, and_, or_, tuple_
 import sqlalchemy as sa
 from pydantic import BaseModel
-from sqlalchemy.orm import selectinload
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Literal, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import asyncio
+import base64
 import io
+import logging
+import math
 import uuid
 from PIL import Image, ImageOps 
 
 from app.core.database import get_db
+from app.core.user_cache import invalidate_user
 from app.api.auth import get_current_user, get_current_user_id
 from app.models.user import User
 from app.models.photo import Photo, PhotoFile
+from app.models.tag import Tag, PhotoTag
 from app.services.storage_factory import get_storage_service
+from app.services.presigner import get_presigner, sign_photo_urls, CACHE_WINDOW_SECONDS, EXPIRY_MARGIN_SECONDS
 from app.services.pipeline_service import create_pipeline_with_tasks
 from app.core.config import settings
 
-router = APIRouter()
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+logger = logging.getLogger(__name__)
+
+# Columns a PhotoResponse is built from; selected as plain rows, no ORM instances
+_PHOTO_COLUMNS = (
+    Photo.photo_id, Photo.filename, Photo.mime_type, Photo.size_bytes, Photo.taken_at,
+    Photo.uploaded_at, Photo.caption, Photo.favorite, Photo.archived,
+    Photo.gps_lat, Photo.gps_lng, Photo.location_name
+)
+# Map markers need only position and popup fields
+_MAP_COLUMNS = (
+    Photo.photo_id, Photo.filename, Photo.taken_at, Photo.gps_lat, Photo.gps_lng, Photo.location_name
+)
+# list_photos sort -> (sort column, descending, ORDER BY); photo_id breaks ties so the
+# keyset cursor is exact
+_SORTS = {
+    "taken_desc": ("taken_at", True, (Photo.taken_at.desc(), Photo.photo_id.desc())),
+    "taken_asc": ("taken_at", False, (Photo.taken_at.asc(), Photo.photo_id.asc())),
+    "created_desc": ("uploaded_at", True, (Photo.uploaded_at.desc(), Photo.photo_id.desc())),
+    "created_asc": ("uploaded_at", False, (Photo.uploaded_at.asc(), Photo.photo_id.asc())),
+}
+# Thumbnail redirects: signed for 6h; a cached URL may come from a B2 token already at
+# half its validity and then sit in the presigner for a window, so the redirect is
+# cacheable for what is guaranteed to remain
+_THUMB_REDIRECT_EXPIRES = 6 * 3600
+_THUMB_REDIRECT_MAX_AGE = _THUMB_REDIRECT_EXPIRES // 2 - CACHE_WINDOW_SECONDS - EXPIRY_MARGIN_SECONDS
+# Bounded fan-out for storage deletes (one HTTP request per file)
+_delete_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="storage-delete")
+
+
+def _safe_float(val):
+    """Float for a numeric column, or None when missing/NaN/inf (not JSON-safe)."""
+    if val is None: return None
+    f = float(val)
+    return f if math.isfinite(f) else None
+
+
+async def _tag_names(db: AsyncSession, photo_ids: List[uuid.UUID]) -> Dict[uuid.UUID, List[str]]:
+    """Tag names per photo, most confident first (Photo.visual_tags order), in one query."""
+    if not photo_ids:
+        return {}
+    result = await db.execute(
+        select(PhotoTag.photo_id, Tag.name)
+        .join(Tag, Tag.tag_id == PhotoTag.tag_id)
+        .where(PhotoTag.photo_id.in_(photo_ids))
+        .order_by(PhotoTag.photo_id, PhotoTag.confidence.desc())
+    )
+    names: Dict[uuid.UUID, List[str]] = {}
+    for photo_id, name in result:
+        names.setdefault(photo_id, []).append(name)
+    return names
+
+
+def _delete_photo_files(storage_provider: Optional[str], prefixes: List[str]) -> None:
+    """
+    Delete every stored file under each photo prefix. Blocking storage calls: run as a
+    sync BackgroundTask, which Starlette executes in its threadpool after the response.
+    Listing and deletes are independent requests, so they fan out over _delete_executor.
+    """
+    storage = get_storage_service(storage_provider)
+
+    def list_prefix(prefix):
+        try:
+            return storage.list_files(prefix=prefix)
+        except Exception:
+            logger.exception("Failed to list files under %s in storage", prefix)
+            return []
+
+    def delete_one(file_id):
+        try:
+            storage.delete_file(file_id)
+        except Exception:
+            logger.exception("Failed to delete %s from storage", file_id)
+
+    file_ids = [f['file_id'] for files in _delete_executor.map(list_prefix, prefixes) for f in files]
+    # Drain the iterator so the task ends only after every delete has finished
+    list(_delete_executor.map(delete_one, file_ids))
+
+
+async def _hard_delete_photos(db: AsyncSession, user_id: uuid.UUID, photo_ids: List[uuid.UUID]) -> list:
+    """
+    Delete the user's photos and release their bytes from the storage quota in one
+    statement (data-modifying CTEs). Returns (photo_id, storage_provider) per deleted photo.
+    Child rows go with ON DELETE CASCADE; the caller commits and evicts the cached user.
+    """
+    deleted = (
+        sa.delete(Photo)
+        .where(Photo.photo_id.in_(photo_ids), Photo.user_id == user_id)
+        .returning(Photo.photo_id, Photo.size_bytes, Photo.storage_provider)
+        .cte("deleted")
+    )
+    freed = select(sa.func.sum(deleted.c.size_bytes)).scalar_subquery()
+    release_quota = (
+        sa.update(User)
+        .where(User.user_id == user_id, sa.exists(select(deleted.c.photo_id)))
+        .values(storage_used_bytes=sa.func.greatest(User.storage_used_bytes - freed, 0))
+        .cte("release_quota")
+    )
+    result = await db.execute(
+        select(deleted.c.photo_id, deleted.c.storage_provider).add_cte(release_quota)
+    )
+    return result.all()
+
+
+def _schedule_file_deletes(background_tasks: BackgroundTasks, user_id: uuid.UUID, deleted) -> None:
+    """Queue storage cleanup for hard-deleted photos, one task per storage provider."""
+    prefixes_by_provider: Dict[str, List[str]] = {}
+    for photo_id, storage_provider in deleted:
+        prefixes_by_provider.setdefault(storage_provider, []).append(
+            f"{settings.STORAGE_PATH_PREFIX}/{user_id}/{photo_id}"
+        )
+    for provider, prefixes in prefixes_by_provider.items():
+        background_tasks.add_task(_delete_photo_files, provider, prefixes)
+
+
+def _encode_cursor(sort_value: Optional[datetime], photo_id: uuid.UUID) -> str:
+    """Opaque keyset cursor for the (sort column, photo_id) of the last photo on a page."""
+    raw = f"{sort_value.isoformat() if sort_value else ''}|{photo_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Optional[datetime], uuid.UUID]:
+    try:
+        sort_value, _, photo_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        return (datetime.fromisoformat(sort_value) if sort_value else None), uuid.UUID(photo_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _seek_after(column, descending: bool, after_value: Optional[datetime], after_id: uuid.UUID):
+    """
+    WHERE clause for rows after (after_value, after_id) in (column, photo_id) order,
+    using Postgres' default NULL placement (first for DESC, last for ASC).
+    Non-NULL seeks are row comparisons, which Postgres uses as a range bound on a
+    (..., column, photo_id) index; an equivalent OR would only be a filter.
+    """
+    after = tuple_(column, Photo.photo_id)
+    if descending:
+        if after_value is None:
+            return or_(column != None, and_(column == None, Photo.photo_id < after_id))
+        return after < tuple_(after_value, after_id)
+    if after_value is None:
+        return and_(column == None, Photo.photo_id > after_id)
+    return or_(after > tuple_(after_value, after_id), column == None)
+
+
+def _photo_item(photo, thumb_urls: Dict[str, str], tags: List[str]) -> dict:
+    """PhotoResponse-shaped dict; rows come from our own DB, so pydantic validation is skipped."""
+    return {
+        "photo_id": str(photo.photo_id),
+        "filename": photo.filename,
+        "mime_type": photo.mime_type,
+        "size_bytes": photo.size_bytes,
+        "taken_at": photo.taken_at,
+        "uploaded_at": photo.uploaded_at,
+        "caption": photo.caption,
+        "favorite": photo.favorite,
+        "archived": photo.archived,
+        "gps_lat": _safe_float(photo.gps_lat),
+        "gps_lng": _safe_float(photo.gps_lng),
+        "location_name": photo.location_name,
+        "thumb_urls": thumb_urls,
+        "tags": tags
+    }
 
 
 @router.get("/{photo_id}/download")
 async def download_photo(
-    photo_id: str,
+    photo_id: uuid.UUID,
     current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
@@ -66,7 +235,7 @@ async def download_photo(
 
 @router.get("/{photo_id}/thumbnail/{size}")
 async def get_thumbnail(
-    photo_id: str,
+    photo_id: uuid.UUID,
     size: int,
     current_user_id: uuid.UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
@@ -77,30 +246,39 @@ async def get_thumbnail(
         size = 512
         
     result = await db.execute(
-        select(Photo).where(
+        select(Photo.storage_provider).where(
             Photo.photo_id == photo_id,
             Photo.user_id == current_user_id,
             Photo.deleted_at == None
         )
     )
-    photo = result.scalar_one_or_none()
+    row = result.first()
     
-    if not photo:
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Photo not found"
         )
     
-    storage = get_storage_service(photo.storage_provider)
     thumb_key = f"{settings.STORAGE_PATH_PREFIX}/{current_user_id}/{photo_id}/thumbnails/thumb_{size}.jpg"
-    
-    # Generate presigned URL
-    thumb_url = storage.generate_presigned_url(thumb_key, expires_in=3600)
-    
-    # Redirect client
+    if row.storage_provider == settings.STORAGE_PROVIDER:
+        # Same URL for everyone asking within a presign window (cached per key), so the
+        # browser can cache the redirect itself and skip this endpoint on scroll-back
+        [thumb_url] = await get_presigner().sign([thumb_key], expires_in=_THUMB_REDIRECT_EXPIRES)
+    else:
+        # The shared presigner only signs for the default provider's bucket
+        storage = get_storage_service(row.storage_provider)
+        thumb_url = storage.generate_presigned_url(thumb_key, expires_in=_THUMB_REDIRECT_EXPIRES)
+    
+    # Redirect client. 307, not a permanent 308: browsers may keep a permanent redirect
+    # past any max-age, and the signed Location expires. `private` because the URL is a
+    # bearer credential for this user's files and must not sit in shared caches.
     return Response(
         status_code=status.HTTP_307_TEMPORARY_REDIRECT,
-        headers={"Location": thumb_url}
+        headers={
+            "Location": thumb_url,
+            "Cache-Control": f"private, max-age={_THUMB_REDIRECT_MAX_AGE}"
+        }
     )
 
 
@@ -125,6 +303,17 @@ class PhotoResponse(BaseModel):
         from_attributes = True
 
 
+class MapPhotoResponse(BaseModel):
+    """Map marker: position plus what the marker popup shows."""
+    photo_id: str
+    filename: str
+    taken_at: Optional[datetime]
+    gps_lat: Optional[float]
+    gps_lng: Optional[float]
+    location_name: Optional[str] = None
+    thumb_urls: dict
+
+
 class PhotoListResponse(BaseModel):
     photos: List[PhotoResponse]
     next_cursor: Optional[str]
@@ -141,7 +330,7 @@ class UpdatePhotoRequest(BaseModel):
 async def list_photos(
     cursor: Optional[str] = Query(None, description="Pagination cursor"),
     limit: int = Query(50, ge=1, le=200),
-    sort: str = Query("taken_desc", regex="^(created_desc|created_asc|taken_desc|taken_asc)$"),
+    sort: Literal["created_desc", "created_asc", "taken_desc", "taken_asc"] = Query("taken_desc"),
     tag: Optional[str] = Query(None, description="Filter by tag name"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -149,10 +338,10 @@ async def list_photos(
     """
     List user's photos in timeline view.
     
-    Supports pagination with cursor and sorting options.
+    Supports keyset pagination (pass back `next_cursor`) and sorting options.
     """
     # Build query
-    query = select(Photo).options(selectinload(Photo.visual_tags)).where(
+    query = select(*_PHOTO_COLUMNS).where(
         Photo.user_id == current_user.user_id,
         Photo.deleted_at == None,
         Photo.storage_provider == settings.STORAGE_PROVIDER
@@ -161,112 +350,60 @@ async def list_photos(
     # Filter by tag if provided
     if tag:
         # Join with PhotoTag and Tag
-        from app.models.tag import Tag, PhotoTag
         query = query.join(PhotoTag, PhotoTag.photo_id == Photo.photo_id)\
                      .join(Tag, Tag.tag_id == PhotoTag.tag_id)\
                      .where(Tag.name == tag)
     
     # Apply sorting
-    if sort == "taken_desc":
-        query = query.order_by(desc(Photo.taken_at))
-    elif sort == "taken_asc":
-        query = query.order_by(Photo.taken_at)
-    elif sort == "created_desc":
-        query = query.order_by(desc(Photo.uploaded_at))
-    else:  # created_asc
-        query = query.order_by(Photo.uploaded_at)
+    sort_attr, descending, order_by = _SORTS[sort]
+    query = query.order_by(*order_by)
+    
+    if cursor:
+        # Keyset seek past the last photo of the previous page
+        query = query.where(_seek_after(getattr(Photo, sort_attr), descending, *_decode_cursor(cursor)))
     
     # Limit results
     query = query.limit(limit + 1)  # Fetch one extra to check has_more
     
-    result = await db.execute(query)
-    photos = result.scalars().all()
+    # The storage token for signing doesn't depend on the rows; fetch both at once
+    result, _ = await asyncio.gather(
+        db.execute(query), get_presigner().prewarm_owner(current_user.user_id)
+    )
+    photos = result.all()
     
     has_more = len(photos) > limit
+    next_cursor = None
     if has_more:
         photos = photos[:limit]
+        next_cursor = _encode_cursor(getattr(photos[-1], sort_attr), photos[-1].photo_id)
     
-    # Generate presigned/authorized URL for download
-    
-    # Build response
-    photo_responses = []
-    
-    # Strict mode: We only show photos for the current provider, so we use that provider's service.
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-    
-    # Helper for safe float conversion
-    import math
-    def safe_float(val):
-        if val is None:
-            return None
-        try:
-            f = float(val)
-            if math.isnan(f) or math.isinf(f):
-                return None
-            return f
-        except (ValueError, TypeError):
-            return None
+    # Strict mode: We only show photos for the current provider, so its presigner signs them all.
+    # thumb_urls also carries the "original" download URL for convenience
+    all_thumb_urls = await sign_photo_urls(photos, current_user.user_id)
+    tag_names = await _tag_names(db, [photo.photo_id for photo in photos])
 
-    for photo in photos:
-        # storage = get_storage_service(photo.storage_provider) # Removed per strict isolation request
-        
-        # Construct full keys
-        key_base = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-        
-        # Generate generic thumbnail URLs (signed)
-        thumb_urls = {
-            "thumb_256": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_256.jpg", expires_in=3600),
-            "thumb_512": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_512.jpg", expires_in=3600),
-            "thumb_1024": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_1024.jpg", expires_in=3600),
-            # Also provide the original download URL here for convenience
-             "original": storage.generate_presigned_url(f"{key_base}/original/{photo.filename}", expires_in=3600)
-        }
-        
-        # We can add a "download_url" field to PhotoResponse if we want, 
-        # or just rely on the frontend knowing to use "original" or constructing it?
-        # The prompt asked to put it in headers or frontend, but here we are providing FULL URLs.
-        # Frontend logic expects `thumb_urls` dict.
-        
-        p_resp = PhotoResponse(
-            photo_id=str(photo.photo_id),
-            filename=photo.filename,
-            mime_type=photo.mime_type,
-            size_bytes=photo.size_bytes,
-            taken_at=photo.taken_at,
-            uploaded_at=photo.uploaded_at,
-            caption=photo.caption,
-            favorite=photo.favorite,
-            archived=photo.archived,
-            gps_lat=safe_float(photo.gps_lat),
-            gps_lng=safe_float(photo.gps_lng),
-            location_name=photo.location_name,
-            thumb_urls=thumb_urls,
-            tags=[t.name for t in photo.visual_tags] if hasattr(photo, 'visual_tags') else []
-        )
-        # Dynamically attach download_url to the response object if schema supports it? 
-        # Schema doesn't have it. `thumb_urls` is a dict, so I effectively added "original" key to it.
-        # Let's verify schema.
-        
-        photo_responses.append(p_resp)
-    
-    return PhotoListResponse(
-        photos=photo_responses,
-        next_cursor=None,  # TODO: Generate cursor from last photo
-        has_more=has_more
-    )
+    # Returned directly: response_model stays for the OpenAPI schema only
+    return ORJSONResponse({
+        "photos": [
+            _photo_item(photo, thumb_urls, tag_names.get(photo.photo_id, []))
+            for photo, thumb_urls in zip(photos, all_thumb_urls)
+        ],
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    })
 
 
-@router.get("/map", response_model=List[PhotoResponse])
+@router.get("/map", response_model=List[MapPhotoResponse])
 async def get_map_photos(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get all photos that have GPS coordinates.
-    Optimized for map view (lighter payload if needed, but reusing PhotoResponse for now).
+    Projects only marker columns; served by the idx_photos_user_provider_gps partial index.
     """
     result = await db.execute(
-        select(Photo).where(
+        select(*_MAP_COLUMNS).where(
             Photo.user_id == current_user.user_id,
             Photo.deleted_at == None,
             Photo.gps_lat != None,
@@ -274,63 +411,46 @@ async def get_map_photos(
             Photo.storage_provider == settings.STORAGE_PROVIDER
         )
     )
-    photos = result.scalars().all()
+    photos = result.all()
     
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-    photo_responses = []
-
-    # Local helper for map too (or move to util if used more widely)
-    import math
-    def safe_float(val):
-        if val is None: return None
-        try:
-            f = float(val)
-            if math.isnan(f) or math.isinf(f): return None
-            return f
-        except: return None
-    
-    for photo in photos:
-        key_base = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-        
-        # We only need small thumbnail for map markers
-        thumb_urls = {
-            "thumb_256": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_256.jpg", expires_in=3600),
+    # We only need small thumbnail for map markers; signed in one cached batch, so
+    # re-opening the map within a presign window reuses the same URLs
+    key_prefix = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/"
+    thumb_256_urls = await get_presigner().sign(
+        [f"{key_prefix}{photo.photo_id}/thumbnails/thumb_256.jpg" for photo in photos], expires_in=3600
+    )
+    return ORJSONResponse([
+        {
+            "photo_id": str(photo.photo_id),
+            "filename": photo.filename,
+            "taken_at": photo.taken_at,
+            "gps_lat": _safe_float(photo.gps_lat),
+            "gps_lng": _safe_float(photo.gps_lng),
+            "location_name": photo.location_name,
+            "thumb_urls": {"thumb_256": thumb_256}
         }
-        
-        photo_responses.append(PhotoResponse(
-            photo_id=str(photo.photo_id),
-            filename=photo.filename,
-            mime_type=photo.mime_type,
-            size_bytes=photo.size_bytes,
-            taken_at=photo.taken_at,
-            uploaded_at=photo.uploaded_at,
-            caption=photo.caption,
-            favorite=photo.favorite,
-            archived=photo.archived,
-            gps_lat=safe_float(photo.gps_lat),
-            gps_lng=safe_float(photo.gps_lng),
-            location_name=photo.location_name,
-            thumb_urls=thumb_urls
-        ))
-        
-    return photo_responses
+        for photo, thumb_256 in zip(photos, thumb_256_urls)
+    ])
 
 
 @router.get("/{photo_id}", response_model=PhotoResponse)
 async def get_photo(
-    photo_id: str,
+    photo_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get photo metadata by ID."""
-    result = await db.execute(
-        select(Photo).where(
-            Photo.photo_id == photo_id,
-            Photo.user_id == current_user.user_id,
-            Photo.deleted_at == None
-        )
+    result, _ = await asyncio.gather(
+        db.execute(
+            select(*_PHOTO_COLUMNS).where(
+                Photo.photo_id == photo_id,
+                Photo.user_id == current_user.user_id,
+                Photo.deleted_at == None
+            )
+        ),
+        get_presigner().prewarm_owner(current_user.user_id)
     )
-    photo = result.scalar_one_or_none()
+    photo = result.one_or_none()
     
     if not photo:
         raise HTTPException(
@@ -338,62 +458,45 @@ async def get_photo(
             detail="Photo not found"
         )
     
-    # Strict isolation
-    storage = get_storage_service(settings.STORAGE_PROVIDER)
-    
-    # Generate thumbnail URLs
-    key_base = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-    thumb_urls = {
-        "thumb_256": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_256.jpg", expires_in=3600),
-        "thumb_512": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_512.jpg", expires_in=3600),
-        "thumb_1024": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_1024.jpg", expires_in=3600),
-        "original": storage.generate_presigned_url(f"{key_base}/original/{photo.filename}", expires_in=3600)
-    }
-    
-    # Safe float helper
-    import math
-    def safe_float(val):
-        if val is None: return None
-        try:
-            f = float(val)
-            if math.isnan(f) or math.isinf(f): return None
-            return f
-        except: return None
+    # Strict isolation: signed by the current provider, same URLs as the timeline
+    [thumb_urls] = await sign_photo_urls([photo], current_user.user_id)
 
-    return PhotoResponse(
-        photo_id=str(photo.photo_id),
-        filename=photo.filename,
-        mime_type=photo.mime_type,
-        size_bytes=photo.size_bytes,
-        taken_at=photo.taken_at,
-        uploaded_at=photo.uploaded_at,
-        caption=photo.caption,
-        favorite=photo.favorite,
-        archived=photo.archived,
-        gps_lat=safe_float(photo.gps_lat),
-        gps_lng=safe_float(photo.gps_lng),
-        location_name=photo.location_name,
-        thumb_urls=thumb_urls,
-        tags=[t.name for t in photo.visual_tags] if hasattr(photo, 'visual_tags') else []
-    )
+    tag_names = await _tag_names(db, [photo.photo_id])
+
+    return ORJSONResponse(_photo_item(photo, thumb_urls, tag_names.get(photo.photo_id, [])))
 
 
 @router.patch("/{photo_id}", response_model=PhotoResponse)
 async def update_photo(
-    photo_id: str,
+    photo_id: uuid.UUID,
     request: UpdatePhotoRequest,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update photo metadata (caption, favorite, archived)."""
+    values = {"updated_at": datetime.utcnow()}
+    if request.caption is not None:
+        values["caption"] = request.caption
+    if request.favorite is not None:
+        values["favorite"] = request.favorite
+    if request.archived is not None:
+        values["archived"] = request.archived
+    
+    # Ownership check, update and read-back in one round trip
     result = await db.execute(
-        select(Photo).where(
+        update(Photo)
+        .where(
             Photo.photo_id == photo_id,
             Photo.user_id == current_user.user_id,
             Photo.deleted_at == None
         )
+        .values(**values)
+        .returning(
+            Photo.photo_id, Photo.filename, Photo.mime_type, Photo.size_bytes,
+            Photo.taken_at, Photo.uploaded_at, Photo.caption, Photo.favorite, Photo.archived
+        )
     )
-    photo = result.scalar_one_or_none()
+    photo = result.one_or_none()
     
     if not photo:
         raise HTTPException(
@@ -401,18 +504,7 @@ async def update_photo(
             detail="Photo not found"
         )
     
-    # Update fields
-    if request.caption is not None:
-        photo.caption = request.caption
-    if request.favorite is not None:
-        photo.favorite = request.favorite
-    if request.archived is not None:
-        photo.archived = request.archived
-    
-    photo.updated_at = datetime.utcnow()
-    
     await db.commit()
-    await db.refresh(photo)
     
     thumb_urls = {
         "thumb_256": f"/api/v1/photos/{photo.photo_id}/thumbnail/256",
@@ -438,58 +530,60 @@ async def update_photo(
 
 @router.patch("/{photo_id}/favorite", status_code=status.HTTP_200_OK)
 async def toggle_favorite(
-    photo_id: str,
+    photo_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Toggle favorite status of a photo."""
+    # Flip in SQL: no read-modify-write race and a single round trip
     result = await db.execute(
-        select(Photo).where(
+        update(Photo)
+        .where(
             Photo.photo_id == photo_id,
             Photo.user_id == current_user.user_id,
             Photo.deleted_at == None
         )
+        .values(favorite=sa.not_(Photo.favorite))
+        .returning(Photo.favorite)
     )
-    photo = result.scalar_one_or_none()
+    favorite = result.scalar_one_or_none()
     
-    if not photo:
+    if favorite is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Photo not found"
         )
     
-    # Toggle favorite
-    photo.favorite = not photo.favorite
     await db.commit()
     
-    return {"favorite": photo.favorite}
+    return {"favorite": favorite}
 
 
 @router.delete("/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_photo(
-    photo_id: str,
+    photo_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Soft-delete a photo (moves to trash). Does NOT delete from B2 storage."""
+    # Soft delete in database only
     result = await db.execute(
-        select(Photo).where(
+        update(Photo)
+        .where(
             Photo.photo_id == photo_id,
             Photo.user_id == current_user.user_id,
             Photo.deleted_at == None
         )
+        .values(deleted_at=datetime.utcnow())
+        .returning(Photo.photo_id)
     )
-    photo = result.scalar_one_or_none()
     
-    if not photo:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Photo not found"
         )
     
-    # Soft delete in database only
-    photo.deleted_at = datetime.utcnow()
-    
     # Note: We do NOT reduce storage quota here because the file still exists in B2
     # Quota is reduced only on permanent delete
     
@@ -506,7 +600,7 @@ async def get_trash(
 ):
     """List photos in trash (deleted_at is not null)."""
     # Build query for deleted photos
-    query = select(Photo).where(
+    query = select(*_PHOTO_COLUMNS).where(
         Photo.user_id == current_user.user_id,
         Photo.deleted_at != None
     ).order_by(desc(Photo.deleted_at))
@@ -514,71 +608,51 @@ async def get_trash(
     # Limit results
     query = query.limit(limit + 1)
     
-    result = await db.execute(query)
-    photos = result.scalars().all()
+    result, _ = await asyncio.gather(
+        db.execute(query), get_presigner().prewarm_owner(current_user.user_id)
+    )
+    photos = result.all()
     
     has_more = len(photos) > limit
     if has_more:
         photos = photos[:limit]
     
-    storage = get_storage_service()
+    all_thumb_urls = await sign_photo_urls(photos, current_user.user_id)
 
-    # Build response
-    photo_responses = []
-    for photo in photos:
-        key_base = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-        
-        thumb_urls = {
-            "thumb_256": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_256.jpg", expires_in=3600),
-            "thumb_512": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_512.jpg", expires_in=3600),
-            "thumb_1024": storage.generate_presigned_url(f"{key_base}/thumbnails/thumb_1024.jpg", expires_in=3600),
-            "original": storage.generate_presigned_url(f"{key_base}/original/{photo.filename}", expires_in=3600)
-        }
-        
-        photo_responses.append(PhotoResponse(
-            photo_id=str(photo.photo_id),
-            filename=photo.filename,
-            mime_type=photo.mime_type,
-            size_bytes=photo.size_bytes,
-            taken_at=photo.taken_at,
-            uploaded_at=photo.uploaded_at,
-            caption=photo.caption,
-            favorite=photo.favorite,
-            archived=photo.archived,
-            thumb_urls=thumb_urls
-        ))
-    
-    return PhotoListResponse(
-        photos=photo_responses,
-        next_cursor=None, # TODO: Implement cursor if needed
-        has_more=has_more
-    )
+    return ORJSONResponse({
+        "photos": [
+            _photo_item(photo, thumb_urls, [])
+            for photo, thumb_urls in zip(photos, all_thumb_urls)
+        ],
+        "next_cursor": None, # TODO: Implement cursor if needed
+        "has_more": has_more
+    })
 
 
 @router.post("/{photo_id}/restore", status_code=status.HTTP_200_OK)
 async def restore_photo(
-    photo_id: str,
+    photo_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Restore a photo from trash."""
     result = await db.execute(
-        select(Photo).where(
+        update(Photo)
+        .where(
             Photo.photo_id == photo_id,
             Photo.user_id == current_user.user_id,
             Photo.deleted_at != None
         )
+        .values(deleted_at=None)
+        .returning(Photo.photo_id)
     )
-    photo = result.scalar_one_or_none()
     
-    if not photo:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Photo not found in trash"
         )
     
-    # Restore
-    photo.deleted_at = None
     await db.commit()
     
     return {"status": "restored"}
@@ -586,57 +660,35 @@ async def restore_photo(
 
 @router.delete("/{photo_id}/permanent", status_code=status.HTTP_204_NO_CONTENT)
 async def permanently_delete_photo(
-    photo_id: str,
+    photo_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Permanently delete a photo from B2 and database."""
-    # Find photo (checked deleted and non-deleted to allow deleting directly if needed, 
-    # but usually from trash so we check for user ownership)
-    result = await db.execute(
-        select(Photo).where(
-            Photo.photo_id == photo_id,
-            Photo.user_id == current_user.user_id
-        )
-    )
-    photo = result.scalar_one_or_none()
+    # Checks deleted and non-deleted alike, to allow deleting directly if needed
+    # (usually it comes from trash); ownership is part of the DELETE's WHERE clause
+    deleted = await _hard_delete_photos(db, current_user.user_id, [photo_id])
     
-    if not photo:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Photo not found"
         )
     
-    # Delete from Storage
-    storage = get_storage_service(photo.storage_provider)
-    try:
-        # List and delete all files (original + thumbnails)
-        prefix = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-        files = storage.list_files(prefix=prefix)
-        for f in files:
-            # delete_file expects 'key' (file_name)
-            storage.delete_file(f['file_id'])
-            
-    except Exception as e:
-        print(f"Warning: Failed to delete file from Storage: {str(e)}")
-        # Proceed to DB delete anyway to free up quota in our system
-    
-    # Hard delete from database
-    await db.delete(photo)
-    
-    # Update user storage quota
-    current_user.storage_used_bytes -= photo.size_bytes
-    if current_user.storage_used_bytes < 0:
-        current_user.storage_used_bytes = 0
-        
     await db.commit()
+    invalidate_user(current_user.user_id)
+    
+    # Storage files (original + thumbnails) are deleted after the response is sent;
+    # a storage failure never blocks freeing the quota in our system
+    _schedule_file_deletes(background_tasks, current_user.user_id, deleted)
     
     return None
 
 
 
 class BatchPhotoRequest(BaseModel):
-    photo_ids: List[str]
+    photo_ids: List[uuid.UUID]
 
 
 @router.post("/batch/delete", status_code=status.HTTP_204_NO_CONTENT)
@@ -692,6 +744,7 @@ async def batch_restore(
 @router.post("/batch/permanent", status_code=status.HTTP_204_NO_CONTENT)
 async def batch_permanent_delete(
     request: BatchPhotoRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -699,43 +752,15 @@ async def batch_permanent_delete(
     if not request.photo_ids:
         return None
 
-    # Fetch photos first to get storage info
-    result = await db.execute(
-        select(Photo).where(
-            Photo.photo_id.in_(request.photo_ids),
-            Photo.user_id == current_user.user_id
-        )
-    )
-    photos = result.scalars().all()
+    deleted = await _hard_delete_photos(db, current_user.user_id, request.photo_ids)
     
-    if not photos:
+    if not deleted:
         return None
-        
-    for photo in photos:
-        # Delete from Storage
-        storage = get_storage_service(photo.storage_provider)
-        try:
-            prefix = f"{settings.STORAGE_PATH_PREFIX}/{current_user.user_id}/{photo.photo_id}"
-            files = storage.list_files(prefix=prefix)
-            for f in files:
-                storage.delete_file(f['file_id'])
-        except Exception as e:
-            print(f"Warning: Failed to delete file for photo {photo.photo_id}: {str(e)}")
-        
-        # Update user quota
-        current_user.storage_used_bytes -= photo.size_bytes
-        if current_user.storage_used_bytes < 0:
-            current_user.storage_used_bytes = 0
-            
-    # Delete from DB
-    await db.execute(
-        sa.delete(Photo).where(
-            Photo.photo_id.in_([p.photo_id for p in photos])
-        )
-    )
     
     await db.commit()
-    await db.commit()
+    invalidate_user(current_user.user_id)
+    
+    _schedule_file_deletes(background_tasks, current_user.user_id, deleted)
     return None
 
 
@@ -3,7 +3,7 @@ Upload API endpoints for presigned URL generation and upload confirmation.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from pydantic import BaseModel
 from typing import Optional
 import uuid
@@ -11,6 +11,7 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.api.auth import get_current_user
+from app.core.user_cache import invalidate_user
 from app.models.user import User
 from app.models.photo import Photo
 from app.models.pipeline import Pipeline, PipelineTask
@@ -331,9 +332,15 @@ async def direct_upload(
                 detail=f"Failed to upload to storage: {str(b2_error)}"
             )
         
-        # Update user storage
-        current_user.storage_used_bytes += len(file_content)
+        # Update user storage in SQL: current_user may come from the user cache, so a
+        # read-modify-write here could overwrite a concurrent upload's increment
+        await db.execute(
+            update(User)
+            .where(User.user_id == current_user.user_id)
+            .values(storage_used_bytes=User.storage_used_bytes + len(file_content))
+        )
         await db.commit()
+        invalidate_user(current_user.user_id)
         
         # Enqueue Celery job for processing (thumbnails, metadata, AI)
         from app.celery_app import celery_app
@@ -16,8 +16,16 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    # Per worker process. Keep workers * (POOL_SIZE + MAX_OVERFLOW) below the server's
+    # (or pgbouncer's) max connections, minus headroom for celery, alembic and admin.
+    # 0 disables pooling (NullPool).
     DATABASE_POOL_SIZE: int = 20
     DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_RECYCLE: int = 1800  # Seconds; replace connections before server/pooler idle timeouts drop them
+    # Prepared statements cached per connection. 0 (default) is required behind pgbouncer
+    # in transaction mode; set e.g. 1024 when connecting to Postgres directly (or via
+    # session-mode pooling) so repeated queries skip parse/plan.
+    DATABASE_STATEMENT_CACHE_SIZE: int = 0
     DB_SCHEMA: str = "photobomb"
     
     # Redis
@@ -50,6 +58,10 @@ class Settings(BaseSettings):
     DEFAULT_STORAGE_QUOTA_GB: int = 100
     MAX_FILE_SIZE_MB: int = 50
     STORAGE_PATH_PREFIX: str = "uploads"  # Override via env var (e.g. "uploads/dev")
+    # Optional CDN origin fronting the bucket (e.g. "https://cdn.example.com"). When set,
+    # signed GET URLs keep their path and query but point at this host, so the edge can
+    # cache objects. The CDN must forward requests to the storage origin unchanged.
+    STORAGE_CDN_URL: str = ""
     
     # Face Recognition
     FACE_RECOGNITION_ENABLED: bool = True
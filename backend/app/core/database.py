@@ -34,11 +34,20 @@ elif database_url and database_url.startswith("postgresql://"):
 engine_kwargs = {
     "echo": settings.DEBUG,
     "future": True,
-    "connect_args": {
+}
+
+if settings.DATABASE_STATEMENT_CACHE_SIZE > 0:
+    # Direct connections: named prepared statements, cached by asyncpg and by
+    # SQLAlchemy's asyncpg adapter, so hot queries are parsed/planned once per connection
+    engine_kwargs["connect_args"] = {
+        "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+    }
+else:
+    engine_kwargs["connect_args"] = {
         "statement_cache_size": 0,
         "prepared_statement_name_func": _pgbouncer_statement_name,
-    },
-}
+    }
 
 if settings.DATABASE_POOL_SIZE == 0:
     print("DEBUG: Disabling connection pooling (NullPool)")
@@ -47,6 +56,7 @@ else:
     engine_kwargs["pool_size"] = settings.DATABASE_POOL_SIZE
     engine_kwargs["max_overflow"] = settings.DATABASE_MAX_OVERFLOW
     engine_kwargs["pool_pre_ping"] = True
+    engine_kwargs["pool_recycle"] = settings.DATABASE_POOL_RECYCLE
 
 engine = create_async_engine(database_url, **engine_kwargs)
 
@@ -3,13 +3,30 @@ JWT token utilities for authentication.
 Implements JWT + refresh token pattern.
 """
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-from jose import JWTError, jwt
+from typing import Optional, Dict, Any, Tuple
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+import jwt
+from cachetools import TTLCache
 from passlib.context import CryptContext
 from app.core.config import settings
 
-# Password hashing context (bcrypt with cost factor 10)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=10)
+# Password hashing context: Argon2id for new hashes (OWASP-style 46 MiB / t=1 / p=2).
+# bcrypt (cost factor 10) is still accepted for existing hashes, which are
+# upgraded to Argon2id on the next successful login.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated=["bcrypt"],
+    argon2__type="ID",
+    argon2__memory_cost=47104,
+    argon2__time_cost=1,
+    argon2__parallelism=2,
+    bcrypt__rounds=10,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -22,6 +39,36 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if its hash uses a deprecated scheme or parameters,
+    return a replacement hash to store. Returns (valid, new_hash_or_None).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# Password hashing is CPU-bound (tens of ms per call); run it off the event loop, at most one per core
+_hash_slots = asyncio.Semaphore(os.cpu_count() or 1)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password in a worker thread, so a login doesn't block other requests."""
+    async with _hash_slots:
+        return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+
+async def averify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password in a worker thread."""
+    async with _hash_slots:
+        return await asyncio.to_thread(verify_and_update_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    """get_password_hash in a worker thread."""
+    async with _hash_slots:
+        return await asyncio.to_thread(get_password_hash, password)
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token.
@@ -97,5 +144,58 @@ def decode_token(token: str) -> Optional[Dict[str, Any]]:
             algorithms=[settings.JWT_ALGORITHM]
         )
         return payload
-    except JWTError:
+    except jwt.InvalidTokenError:
         return None
+
+
+# Verified payloads keyed by token digest, so a token reused across requests is
+# only HMAC-verified and parsed once a minute. Entries never outlive the token's exp.
+# Rejected tokens are remembered briefly too, so a client retrying a bad token
+# doesn't cost a verify per request.
+_decoded_tokens: TTLCache = TTLCache(maxsize=10000, ttl=60)
+_decoded_tokens_lock = threading.Lock()
+_INVALID_TOKEN_TTL = 5
+
+
+def _decode_cached(token: str) -> Tuple[Optional[Dict[str, Any]], Optional[uuid.UUID]]:
+    """Cached (payload, parsed `sub` UUID) for a token; (None, None) if invalid."""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    
+    with _decoded_tokens_lock:
+        cached = _decoded_tokens.get(key)
+    if cached is not None:
+        payload, user_id, valid_until = cached
+        if valid_until > now:
+            return payload, user_id
+    
+    payload = decode_token(token)
+    user_id = None
+    if payload is None:
+        valid_until = now + _INVALID_TOKEN_TTL
+    else:
+        valid_until = payload.get("exp") or now + _decoded_tokens.ttl
+        try:
+            user_id = uuid.UUID(payload.get("sub"))
+        except (TypeError, ValueError):
+            pass
+    
+    with _decoded_tokens_lock:
+        _decoded_tokens[key] = (payload, user_id, valid_until)
+    return payload, user_id
+
+
+def decode_token_cached(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Same as decode_token, but memoizes results: valid tokens for up to 60 seconds
+    (capped at their exp), invalid ones for 5 seconds.
+    """
+    return _decode_cached(token)[0]
+
+
+def decode_token_user_id(token: str) -> Optional[uuid.UUID]:
+    """
+    Verified `sub` of a token as a UUID, or None if the token or subject is invalid.
+    The UUID is parsed once per cached token, not once per request.
+    """
+    return _decode_cached(token)[1]
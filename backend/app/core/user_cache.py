@@ -0,0 +1,61 @@
+"""
+Short-lived in-process cache of user rows for the auth dependencies.
+
+Every authenticated request loads the caller's User just to check it exists and
+isn't soft-deleted. Column values are cached for a few seconds and re-attached to
+the request's session without a SELECT. ORM updates/deletes of a User evict its
+entry immediately, so only out-of-band writes can be up to USER_CACHE_TTL stale.
+"""
+import threading
+import uuid
+from typing import Optional, Union
+
+from cachetools import TTLCache
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.models.user import User
+
+USER_CACHE_TTL = 10
+
+_users: TTLCache = TTLCache(maxsize=50_000, ttl=USER_CACHE_TTL)
+_users_lock = threading.Lock()
+_columns = [attr.key for attr in User.__mapper__.column_attrs]
+
+
+async def get_user_cached(db: AsyncSession, user_id: Union[str, uuid.UUID]) -> Optional[User]:
+    """
+    Load an active (not soft-deleted) user by id, from cache when possible.
+    The returned User is attached to `db`, so changes to it are flushed as usual.
+    """
+    key = str(user_id)
+    with _users_lock:
+        values = _users.get(key)
+
+    if values is None:
+        result = await db.execute(
+            select(User).where(User.user_id == user_id, User.deleted_at.is_(None))
+        )
+        user = result.scalar_one_or_none()
+        if user is not None:
+            with _users_lock:
+                _users[key] = {name: getattr(user, name) for name in _columns}
+        return user
+
+    # Rebuild as a clean detached instance and attach it without a SELECT
+    user = User(**values)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+def invalidate_user(user_id: Union[str, uuid.UUID]) -> None:
+    """Drop a user's cached row (e.g. after a Core UPDATE the ORM doesn't see)."""
+    with _users_lock:
+        _users.pop(str(user_id), None)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_on_write(mapper, connection, target):
+    invalidate_user(target.user_id)
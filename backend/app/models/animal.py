@@ -72,6 +72,7 @@ class AnimalDetection(Base):
     __table_args__ = (
         Index('idx_animal_detections_animal', 'animal_id'),
         Index('idx_animal_detections_photo', 'photo_id'),
+        Index('ix_animal_detections_animal_photo', 'animal_id', 'photo_id'),
         {'schema': settings.DB_SCHEMA}
     )
     
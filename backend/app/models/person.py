@@ -59,6 +59,9 @@ class Face(Base):
     location_bottom = Column(Integer, nullable=False)
     location_left = Column(Integer, nullable=False)
     
+    # Set once the crop at faces/{face_id}.jpg has been uploaded
+    crop_ready = Column(Boolean, default=False, server_default='false', nullable=False)
+    
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
     # Relationships
@@ -68,6 +71,8 @@ class Face(Base):
     __table_args__ = (
         Index('idx_faces_person', 'person_id'),
         Index('idx_faces_photo', 'photo_id'),
+        # COUNT(DISTINCT photo_id) per person and the person->photos semi-join as index-only scans
+        Index('ix_faces_person_photo', 'person_id', 'photo_id'),
         {'schema': settings.DB_SCHEMA}
     )
     
@@ -87,7 +87,11 @@ class Photo(Base):
             name='valid_mime_type'
         ),
         Index('idx_photos_user_taken', 'user_id', 'taken_at', postgresql_where="deleted_at IS NULL"),
-        Index('idx_photos_user_provider_taken', 'user_id', 'storage_provider', 'taken_at', postgresql_where="deleted_at IS NULL"),
+        # Keyset pagination for list_photos: (sort column, photo_id) within a user's provider
+        Index('idx_photos_user_provider_taken_id', 'user_id', 'storage_provider', 'taken_at', 'photo_id', postgresql_where="deleted_at IS NULL"),
+        Index('idx_photos_user_provider_uploaded_id', 'user_id', 'storage_provider', 'uploaded_at', 'photo_id', postgresql_where="deleted_at IS NULL"),
+        # Map view: only live photos with coordinates
+        Index('idx_photos_user_provider_gps', 'user_id', 'storage_provider', postgresql_where="deleted_at IS NULL AND gps_lat IS NOT NULL AND gps_lng IS NOT NULL"),
         Index('idx_photos_user_uploaded', 'user_id', 'uploaded_at', postgresql_where="deleted_at IS NULL"),
         Index('idx_photos_favorite', 'user_id', 'uploaded_at', postgresql_where="favorite = true AND deleted_at IS NULL"),
         Index('idx_photos_user_deleted', 'user_id', 'deleted_at', postgresql_where="deleted_at IS NOT NULL"),
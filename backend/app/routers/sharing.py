@@ -14,6 +14,7 @@ from app.models.photo import Photo
 from app.models.share_link import ShareLink, ShareLinkView
 from app.schemas.sharing import ShareLinkCreate, ShareLinkResponse, SharedAlbumView
 from app.services.storage_factory import get_storage_service
+from app.services.presigner import THUMB_NAMES, photo_url_keys
 from app.core.config import settings
 
 router = APIRouter()
@@ -197,11 +198,9 @@ async def view_shared_album(
         owner_name = owner.full_name
         owner_user_id = owner.user_id
 
-    # Generate Signed URLs
+    # Generate Signed URLs. Viewers are not the uploader, so each URL gets its own
+    # per-file token (an owner-prefix batch token would expose the uploader's other files)
     storage = get_storage_service()
-    
-    def sign_b2_url(key: str) -> str:
-        return storage.generate_presigned_url(key, expires_in=86400)
 
     # Process photos with Signed URLs
     photo_list = []
@@ -217,14 +216,9 @@ async def view_shared_album(
         uploader_name = photo.user.full_name if photo.user else "Unknown"
         uploader_avatar = None # photo.user.avatar_url if we had one
         
-        key_base = f"{settings.STORAGE_PATH_PREFIX}/{uploader_id}/{photo.photo_id}"
-
-        # Generate signed URLs manually using the batch token
         thumb_urls = {
-            "thumb_256": sign_b2_url(f"{key_base}/thumbnails/thumb_256.jpg"),
-            "thumb_512": sign_b2_url(f"{key_base}/thumbnails/thumb_512.jpg"),
-            "thumb_1024": sign_b2_url(f"{key_base}/thumbnails/thumb_1024.jpg"),
-            "original": sign_b2_url(f"{key_base}/original/{photo.filename}")
+            name: storage.generate_presigned_url(key, expires_in=86400)
+            for name, key in zip(THUMB_NAMES, photo_url_keys(uploader_id, photo.photo_id, photo.filename))
         }
         
         photo_list.append({
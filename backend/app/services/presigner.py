@@ -0,0 +1,180 @@
+"""
+Two-tier (in-process + Redis) cache for presigned GET URLs.
+
+List endpoints re-sign the same object keys on every scroll/refresh. Signed URLs
+are cached per key for a fixed time window, so repeat requests within the window
+are dict lookups (or one Redis MGET on another worker) instead of fresh
+signatures (or B2 authorization calls).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import redis.asyncio as aioredis
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.services.storage_factory import get_storage_service
+from app.services.storage_interface import StorageInterface
+
+logger = logging.getLogger(__name__)
+
+# Cache window; a URL is never served from cache more than this long after it was signed
+CACHE_WINDOW_SECONDS = 900
+# Minimum validity a cached URL must still have when handed out
+EXPIRY_MARGIN_SECONDS = 60
+# Signed URLs kept per process (a few hundred bytes each)
+LOCAL_CACHE_SIZE = 50_000
+
+# Per-photo URL names and their key suffixes under "{prefix}/{owner_id}/{photo_id}";
+# the original is keyed by its filename
+THUMB_NAMES = ("thumb_256", "thumb_512", "thumb_1024", "original")
+THUMB_SUFFIXES = ("/thumbnails/thumb_256.jpg", "/thumbnails/thumb_512.jpg", "/thumbnails/thumb_1024.jpg")
+
+# Shared pool for signing batches off the event loop (HMAC work, or B2 auth calls)
+_sign_executor = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="presign"
+)
+
+
+class CachedPresigner:
+    """
+    Wraps a storage provider's batch signer with an in-process cache backed by Redis.
+    Redis failures are logged and treated as misses; signing never depends on Redis.
+    """
+
+    def __init__(self, storage: StorageInterface, redis_client: Optional[aioredis.Redis]):
+        self.storage = storage
+        self.redis = redis_client
+        # Per-process tier in front of Redis; only touched from the event loop
+        self._local: TTLCache = TTLCache(maxsize=LOCAL_CACHE_SIZE, ttl=CACHE_WINDOW_SECONDS)
+
+    def _cache_key(self, key: str, expires_in: int, window: int) -> str:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return f"presign:{settings.STORAGE_PROVIDER}:{expires_in}:{digest}:{window}"
+
+    async def _sign_batch(self, keys: List[str], expires_in: int) -> List[str]:
+        """Run the provider's batch signer in the shared pool so the event loop stays free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _sign_executor, self.storage.generate_presigned_urls_batch, keys, expires_in
+        )
+
+    async def prewarm_owner(self, user_id, expires_in: int = 3600) -> None:
+        """
+        Fetch the owner-prefix download token batch signing will need (B2 only), so callers
+        can overlap that round trip with their DB query. Failures are left to sign().
+        """
+        authorize = getattr(self.storage, "get_cached_download_authorization", None)
+        if authorize is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                _sign_executor, authorize, f"{settings.STORAGE_PATH_PREFIX}/{user_id}/", expires_in
+            )
+        except Exception as e:
+            logger.warning(f"Download token prewarm failed: {e}")
+
+    async def sign(self, keys: List[str], expires_in: int = 3600) -> List[str]:
+        """Return signed URLs for `keys`, in order, signing only cache misses."""
+        if not keys:
+            return []
+
+        ttl = min(CACHE_WINDOW_SECONDS, expires_in - EXPIRY_MARGIN_SECONDS)
+        if ttl <= 0:
+            return await self._sign_batch(keys, expires_in)
+
+        window = int(time.time() // CACHE_WINDOW_SECONDS)
+        cache_keys = [self._cache_key(key, expires_in, window) for key in keys]
+
+        # Local tier only for full-window TTLs: a URL keyed by the current window was
+        # signed within it, so it is at most CACHE_WINDOW_SECONDS old
+        use_local = ttl == CACHE_WINDOW_SECONDS
+        urls = [self._local.get(ck) for ck in cache_keys] if use_local else [None] * len(keys)
+        misses = [i for i, url in enumerate(urls) if url is None]
+        if not misses:
+            return urls
+
+        if self.redis is not None:
+            try:
+                remote = await self.redis.mget([cache_keys[i] for i in misses])
+            except Exception as e:
+                logger.warning(f"Presign cache read failed: {e}")
+                remote = [None] * len(misses)
+            for i, url in zip(misses, remote):
+                if url is not None:
+                    urls[i] = url
+                    if use_local:
+                        self._local[cache_keys[i]] = url
+            misses = [i for i in misses if urls[i] is None]
+            if not misses:
+                return urls
+
+        fresh = await self._sign_batch([keys[i] for i in misses], expires_in)
+        for i, url in zip(misses, fresh):
+            urls[i] = url
+            if use_local and url:
+                self._local[cache_keys[i]] = url
+
+        if self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for i, url in zip(misses, fresh):
+                        if url:
+                            pipe.setex(cache_keys[i], ttl, url)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Presign cache write failed: {e}")
+
+        return urls
+
+
+_presigner: Optional[CachedPresigner] = None
+
+
+def get_presigner() -> CachedPresigner:
+    """Get the process-wide presigner for the default storage provider."""
+    global _presigner
+
+    if _presigner is None:
+        redis_client = None
+        try:
+            redis_kwargs = {
+                "decode_responses": True,
+                "socket_connect_timeout": 1,
+                "socket_timeout": 1,
+            }
+            if settings.REDIS_PASSWORD:
+                redis_kwargs["password"] = settings.REDIS_PASSWORD
+            if settings.REDIS_URL.startswith("rediss://"):
+                # Match celery_app: managed Redis (e.g. Upstash) handles certs
+                redis_kwargs["ssl_cert_reqs"] = None
+            redis_client = aioredis.from_url(settings.REDIS_URL, **redis_kwargs)
+        except Exception as e:
+            logger.warning(f"Presign cache disabled, could not configure Redis: {e}")
+
+        _presigner = CachedPresigner(get_storage_service(), redis_client)
+
+    return _presigner
+
+
+def photo_url_keys(owner_id, photo_id, filename: str) -> List[str]:
+    """Storage keys for one photo's URLs, in THUMB_NAMES order."""
+    key_base = f"{settings.STORAGE_PATH_PREFIX}/{owner_id}/{photo_id}"
+    return [key_base + suffix for suffix in THUMB_SUFFIXES] + [f"{key_base}/original/{filename}"]
+
+
+async def sign_photo_urls(photos, owner_id, expires_in: int = 3600) -> List[Dict[str, str]]:
+    """
+    thumb_urls dicts for `photos` (anything with photo_id and filename, all owned by
+    `owner_id`), signed in one presigner batch.
+    """
+    keys = [key for photo in photos for key in photo_url_keys(owner_id, photo.photo_id, photo.filename)]
+    urls = await get_presigner().sign(keys, expires_in=expires_in)
+    per_photo = len(THUMB_NAMES)
+    return [dict(zip(THUMB_NAMES, urls[i:i + per_photo])) for i in range(0, len(urls), per_photo)]
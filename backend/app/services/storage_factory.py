@@ -12,8 +12,8 @@ def get_storage_service(provider: str = None) -> StorageInterface:
     """
     global _storage_instances
     
-    if not provider:
-        provider = settings.STORAGE_PROVIDER.lower()
+    # Normalize so "S3" and "s3" share one instance (and don't fall through to B2)
+    provider = (provider or settings.STORAGE_PROVIDER).strip().lower()
     
     if provider in _storage_instances:
         return _storage_instances[provider]
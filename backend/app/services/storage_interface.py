@@ -33,6 +33,17 @@ class StorageInterface(Protocol):
         """Generate signed URL for GET access (download)."""
         ...
 
+    def generate_presigned_urls_batch(
+        self,
+        keys: List[str],
+        expires_in: int = 3600
+    ) -> List[str]:
+        """
+        Generate signed GET URLs for many keys in one pass.
+        Returns URLs in the same order as `keys`.
+        """
+        ...
+
     def get_download_url_base(self) -> str:
         """Return base URL for downloads (legacy B2 compatibility)."""
         ...
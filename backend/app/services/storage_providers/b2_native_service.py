@@ -2,10 +2,21 @@ from app.services.storage_interface import StorageInterface
 from app.core.config import settings
 from b2sdk.v2 import B2Api, InMemoryAccountInfo
 from b2sdk.v2.exception import B2Error
+from cachetools import TTLCache
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
+import threading
+import time
 import requests
 
+# Owner-prefix download tokens kept per process, and how long a token is reused
+# for: half its validity, so URLs built from a cached token still have at least
+# half of their requested lifetime left
+DOWNLOAD_AUTH_CACHE_SIZE = 10_000
+DOWNLOAD_AUTH_REUSE_FRACTION = 0.5
+# Striped locks so concurrent cold misses for one prefix make a single B2 call
+_AUTH_LOCK_STRIPES = 64
+
 class B2NativeService:
     """
     Backblaze B2 Native Storage Provider (Legacy).
@@ -15,6 +26,11 @@ class B2NativeService:
         self.info = InMemoryAccountInfo()
         self.api = B2Api(self.info)
         self._authorized = False
+        self.cdn_url = settings.STORAGE_CDN_URL.rstrip("/")
+        # (prefix, valid_duration) -> (token, reuse_until); signing runs on worker threads
+        self._auth_cache: TTLCache = TTLCache(maxsize=DOWNLOAD_AUTH_CACHE_SIZE, ttl=86400)
+        self._auth_cache_lock = threading.Lock()
+        self._auth_locks = [threading.Lock() for _ in range(_AUTH_LOCK_STRIPES)]
     
     def authorize(self):
         if not self._authorized:
@@ -69,17 +85,74 @@ class B2NativeService:
         # Ideally we should authorize specific file name prefix like 'key'
         token = self.get_download_authorization(key, valid_duration=expires_in)
         
-        download_url = self.info.get_download_url()
+        download_url = self.cdn_url or self.info.get_download_url()
         bucket_name = settings.B2_BUCKET_NAME
         
         # B2 URL structure requires bucket name
         final_url = f"{download_url}/file/{bucket_name}/{key}?Authorization={token}"
         return final_url
 
+    def generate_presigned_urls_batch(self, keys: List[str], expires_in: int = 3600) -> List[str]:
+        """
+        Per-key signing costs one b2_get_download_authorization round trip per URL.
+        Instead, group keys by owner ("{STORAGE_PATH_PREFIX}/{user_id}/"), authorize each
+        owner's prefix once (cached across requests), and reuse that token for every key in it.
+        Grouping by owner keeps a token from ever covering another user's files, so batch
+        signing is only for URLs handed to the owner themselves.
+        """
+        if not keys:
+            return []
+        self.authorize()
+
+        owner_depth = settings.STORAGE_PATH_PREFIX.count("/") + 2
+        groups: Dict[str, List[str]] = {}
+        for key in keys:
+            parts = key.split("/", owner_depth)
+            group = "/".join(parts[:owner_depth]) + "/" if len(parts) > owner_depth else key
+            groups.setdefault(group, []).append(key)
+
+        # The token query string is shared by every key in a group; build it once
+        auth_queries = {}
+        for group, group_keys in groups.items():
+            auth_q = "?Authorization=" + self.get_cached_download_authorization(group, valid_duration=expires_in)
+            for key in group_keys:
+                auth_queries[key] = auth_q
+
+        base = f"{self.cdn_url or self.info.get_download_url()}/file/{settings.B2_BUCKET_NAME}/"
+        return [base + key + auth_queries[key] for key in keys]
+
     def get_download_url_base(self) -> str:
         self.authorize()
         return self.info.get_download_url()
 
+    def get_cached_download_authorization(self, prefix: str, valid_duration: int = 86400) -> str:
+        """
+        get_download_authorization, reusing a token for the same prefix and duration
+        for DOWNLOAD_AUTH_REUSE_FRACTION of its validity. Thread-safe.
+        """
+        cache_key = (prefix, valid_duration)
+        token = self._cached_download_token(cache_key)
+        if token:
+            return token
+
+        with self._auth_locks[hash(cache_key) % _AUTH_LOCK_STRIPES]:
+            # Another thread may have fetched it while we waited
+            token = self._cached_download_token(cache_key)
+            if token:
+                return token
+            token = self.get_download_authorization(prefix, valid_duration=valid_duration)
+            reuse_until = time.monotonic() + valid_duration * DOWNLOAD_AUTH_REUSE_FRACTION
+            with self._auth_cache_lock:
+                self._auth_cache[cache_key] = (token, reuse_until)
+            return token
+
+    def _cached_download_token(self, cache_key) -> str:
+        with self._auth_cache_lock:
+            cached = self._auth_cache.get(cache_key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        return ""
+
     def get_download_authorization(self, prefix: str, valid_duration: int = 86400) -> str:
         """Legacy support for B2 batch auth."""
         self.authorize()
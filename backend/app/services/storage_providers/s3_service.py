@@ -4,6 +4,9 @@ import aioboto3
 import boto3
 from botocore.config import Config
 from datetime import datetime, timedelta
+from urllib.parse import quote, urlsplit
+import hashlib
+import hmac
 import os
 from typing import Dict, Any, List
 
@@ -20,6 +23,7 @@ class S3Service:
         self.secret_key = settings.S3_SECRET_ACCESS_KEY
         self.bucket_name = settings.S3_BUCKET_NAME
         self.region_name = settings.S3_REGION_NAME
+        self.cdn_url = settings.STORAGE_CDN_URL.rstrip("/")
         
         self.session = boto3.session.Session()
         # We start with sync client for simple URL signing which is local CPU bound anyway
@@ -31,6 +35,8 @@ class S3Service:
             region_name=self.region_name,
             config=Config(signature_version='s3v4')
         )
+        # (date_stamp, key) for the batch signer; the SigV4 signing key only changes daily
+        self._signing_key = (None, None)
 
     def generate_presigned_upload_url(
         self,
@@ -89,11 +95,68 @@ class S3Service:
                 Params={'Bucket': self.bucket_name, 'Key': key},
                 ExpiresIn=expires_in
             )
+            if self.cdn_url:
+                # Signature covers the origin host, which the CDN forwards to
+                parts = urlsplit(url)
+                url = self.cdn_url + url[len(f"{parts.scheme}://{parts.netloc}"):]
             return url
         except Exception as e:
             print(f"Error signing URL: {e}")
             return ""
 
+    def _get_signing_key(self, date_stamp: str) -> bytes:
+        cached_date, cached_key = self._signing_key
+        if cached_date == date_stamp:
+            return cached_key
+        k = hmac.new(("AWS4" + self.secret_key).encode(), date_stamp.encode(), hashlib.sha256).digest()
+        for part in (self.region_name, "s3", "aws4_request"):
+            k = hmac.new(k, part.encode(), hashlib.sha256).digest()
+        self._signing_key = (date_stamp, k)
+        return k
+
+    def generate_presigned_urls_batch(self, keys: List[str], expires_in: int = 3600) -> List[str]:
+        """
+        Generate GET URLs for many keys.
+        Signs SigV4 query strings locally: the signing key, credential scope and
+        shared query string are computed once, so each key costs one SHA-256 and
+        one HMAC instead of a full boto3 request-signing round.
+        Produces the same path-style URLs boto3 does for a custom endpoint; without
+        one (plain AWS, virtual-host addressing) it falls back to boto3 per key.
+        """
+        if not self.endpoint_url:
+            return [self.generate_presigned_url(key, expires_in) for key in keys]
+
+        endpoint = urlsplit(self.endpoint_url)
+        host = endpoint.netloc
+        base_path = endpoint.path.rstrip("/")
+
+        amz_date = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        date_stamp = amz_date[:8]
+        scope = f"{date_stamp}/{self.region_name}/s3/aws4_request"
+        signing_key = self._get_signing_key(date_stamp)
+
+        # Parameters are already in canonical (sorted) order
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(f'{self.access_key}/{scope}', safe='-_.~')}"
+            f"&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={expires_in}"
+            "&X-Amz-SignedHeaders=host"
+        )
+        request_tail = f"\n{query}\nhost:{host}\n\nhost\nUNSIGNED-PAYLOAD"
+        sts_head = f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n"
+        # The canonical request still names the origin host; only the URL points at the CDN
+        url_head = self.cdn_url or f"{endpoint.scheme}://{host}"
+
+        urls = []
+        for key in keys:
+            path = f"{base_path}/{self.bucket_name}/{quote(key, safe='/~')}"
+            canonical_request = f"GET\n{path}{request_tail}"
+            string_to_sign = sts_head + hashlib.sha256(canonical_request.encode()).hexdigest()
+            signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+            urls.append(f"{url_head}{path}?{query}&X-Amz-Signature={signature}")
+        return urls
+
     def get_download_url_base(self) -> str:
         # Not really applicable for S3 presigned URLs as they contain the base.
         # Can return endpoint.
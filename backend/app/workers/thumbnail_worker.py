@@ -792,6 +792,7 @@ def process_photo_analysis(self, upload_id: str, photo_id: str, pipeline_id: Opt
                             # Download temp and re-upload to final location
                             crop_bytes = storage.download_file_bytes(temp_crop_key)
                             storage.upload_bytes(crop_bytes, final_face_key, content_type='image/jpeg')
+                            new_face.crop_ready = True
                             # Delete temp
                             storage.delete_file(temp_crop_key)
                         except Exception as e:
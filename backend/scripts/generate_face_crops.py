@@ -83,6 +83,8 @@ async def process_face_crop(db, face):
                 key=crop_key,
                 content_type='image/jpeg'
             )
+            face.crop_ready = True
+            await db.commit()
             logger.info(f"Uploaded face crop {crop_key}")
             
             if os.path.exists(crop_path):
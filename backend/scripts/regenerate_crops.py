@@ -43,6 +43,9 @@ async def process_photo_crops(db, photo, faces, animals, storage):
         key = f"{settings.STORAGE_PATH_PREFIX}/{photo.user_id}/faces/{face.face_id}.jpg"
         if not storage.file_exists(key):
             missing_faces.append(face)
+        elif not face.crop_ready:
+            # Crop is there but was never flagged (e.g. uploaded by a script)
+            face.crop_ready = True
             
     # Check Animals
     for animal in animals:
@@ -70,6 +73,7 @@ async def process_photo_crops(db, photo, faces, animals, storage):
             box = (face.location_top, face.location_right, face.location_bottom, face.location_left)
             key = f"{settings.STORAGE_PATH_PREFIX}/{photo.user_id}/faces/{face.face_id}.jpg"
             if save_crop(storage, tmp_path, box, key, padding=0.4):
+                face.crop_ready = True
                 logger.info(f"Restored Face {face.face_id}")
             else:
                 logger.error(f"Failed to restore Face {face.face_id}")
@@ -109,6 +113,7 @@ async def main():
         logger.info(f"Scanning {len(photos)} photos...")
         for photo in photos:
             await process_photo_crops(db, photo, photo.faces, photo.animal_detections, storage)
+            await db.commit()
             
     logger.info("Regeneration Complete.")
 
@@ -1,18 +1,31 @@
 """
 Pytest configuration and fixtures.
 """
+import os
 import pytest
+import pytest_asyncio
 import asyncio
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
 from app.core.database import Base
 from app.main import app
 from app.core.database import get_db
+from app.core.security import create_access_token
+from app.models.user import User
+from app.services import presigner
 
 
 # Test database URL
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
+# Scratch Postgres for tests that need Postgres-only SQL (data-modifying CTEs,
+# NULL ordering, RETURNING). Its DB_SCHEMA is dropped and recreated per test;
+# those tests are skipped when this is unset.
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -54,3 +67,73 @@ async def client(test_db):
     yield app
     
     app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def pg_sessionmaker():
+    """Session factory on a freshly created schema in TEST_POSTGRES_URL."""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    
+    engine = create_async_engine(TEST_POSTGRES_URL, echo=False)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {settings.DB_SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {settings.DB_SCHEMA}"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.run_sync(Base.metadata.create_all)
+    
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA {settings.DB_SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def pg_db(pg_sessionmaker):
+    """One session on the test Postgres."""
+    async with pg_sessionmaker() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def pg_client(pg_sessionmaker):
+    """HTTP client for the app, with each request's get_db session on the test Postgres."""
+    async def override_get_db():
+        async with pg_sessionmaker() as session:
+            yield session
+    
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def make_user(pg_sessionmaker):
+    """Factory: insert a user and return (user, Authorization headers)."""
+    async def _make_user(email="user@example.com", **fields):
+        async with pg_sessionmaker() as session:
+            user = User(email=email, full_name=fields.pop("full_name", "Test User"), **fields)
+            session.add(user)
+            await session.commit()
+        token = create_access_token(data={"sub": str(user.user_id), "email": user.email})
+        return user, {"Authorization": f"Bearer {token}"}
+    
+    return _make_user
+
+
+class FakeStorage:
+    """Storage double whose URLs name the signed key; nothing leaves the process."""
+    
+    def generate_presigned_url(self, key: str, expires_in: int = 3600) -> str:
+        return f"https://storage.test/{key}?expires_in={expires_in}"
+    
+    def generate_presigned_urls_batch(self, keys, expires_in: int = 3600):
+        return [self.generate_presigned_url(key, expires_in) for key in keys]
+
+
+@pytest.fixture
+def fake_presigner(monkeypatch):
+    """Point get_presigner() at FakeStorage, with no Redis tier."""
+    monkeypatch.setattr(presigner, "_presigner", presigner.CachedPresigner(FakeStorage(), None))
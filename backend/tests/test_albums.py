@@ -0,0 +1,52 @@
+"""
+Tests for the albums API.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.models.album import Album, album_photos
+from app.models.photo import Photo
+
+
+@pytest.mark.asyncio
+async def test_list_albums(pg_client, pg_sessionmaker, make_user, mocker):
+    """Counts, the newest three thumbnails and the cover, signed under each photo's owner."""
+    storage = mocker.Mock()
+    storage.generate_presigned_url.side_effect = lambda key, expires_in: f"https://storage.test/{key}"
+    mocker.patch("app.api.albums.get_storage_service", return_value=storage)
+    user, headers = await make_user("albums@example.com", full_name="Album Owner")
+    photos = [
+        Photo(user_id=user.user_id, filename=f"IMG_{i}.jpg", mime_type="image/jpeg", size_bytes=1,
+              sha256=f"{i:064x}", storage_provider=settings.STORAGE_PROVIDER)
+        for i in range(5)
+    ]
+    album = Album(user_id=user.user_id, name="Trip", cover_photo=photos[0])
+    async with pg_sessionmaker() as session:
+        session.add_all(photos + [album, Album(user_id=user.user_id, name="Empty")])
+        await session.flush()
+        added = datetime(2024, 5, 1)
+        await session.execute(insert(album_photos), [
+            {"album_id": album.album_id, "photo_id": photo.photo_id, "added_at": added + timedelta(minutes=i)}
+            for i, photo in enumerate(photos)
+        ])
+        await session.commit()
+
+    response = await pg_client.get("/api/v1/albums", headers=headers)
+
+    assert response.status_code == 200, response.text
+    by_name = {item["name"]: item for item in response.json()}
+    trip = by_name["Trip"]
+    assert trip["album_id"] == str(album.album_id)
+    assert trip["photo_count"] == 5
+    assert trip["cover_photo_id"] == str(photos[0].photo_id)
+    prefix = f"https://storage.test/{settings.STORAGE_PATH_PREFIX}/{user.user_id}"
+    assert trip["cover_photo_url"] == f"{prefix}/{photos[0].photo_id}/thumbnails/thumb_512.jpg"
+    newest = [str(p.photo_id) for p in reversed(photos)][:3]
+    assert trip["thumbnail_ids"] == newest
+    assert trip["thumbnail_urls"] == [f"{prefix}/{pid}/thumbnails/thumb_512.jpg" for pid in newest]
+
+    empty = by_name["Empty"]
+    assert (empty["photo_count"], empty["thumbnail_ids"], empty["cover_photo_url"]) == (0, [], None)
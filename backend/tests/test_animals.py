@@ -0,0 +1,50 @@
+"""
+Tests for the animals API.
+"""
+import pytest
+
+from app.core.config import settings
+from app.models.animal import Animal, AnimalDetection
+from app.models.photo import Photo
+
+
+def _detection(photo, animal):
+    return AnimalDetection(photo_id=photo.photo_id, animal_id=animal.animal_id, label="dog",
+                           confidence=0.9, location_top=0, location_right=10,
+                           location_bottom=10, location_left=0)
+
+
+@pytest.mark.asyncio
+async def test_list_animals(pg_client, pg_sessionmaker, fake_presigner, make_user):
+    """Distinct photo counts per animal, most photographed first, with signed cover crops."""
+    user, headers = await make_user("animals@example.com")
+    photos = [
+        Photo(user_id=user.user_id, filename=f"IMG_{i}.jpg", mime_type="image/jpeg", size_bytes=1,
+              sha256=f"{i:064x}", storage_provider=settings.STORAGE_PROVIDER)
+        for i in range(3)
+    ]
+    buddy = Animal(user_id=user.user_id, name="Buddy")
+    stray = Animal(user_id=user.user_id)
+    async with pg_sessionmaker() as session:
+        session.add_all(photos + [buddy, stray])
+        await session.flush()
+        # Two detections of Buddy in the first photo count once
+        buddy_detections = [_detection(photos[0], buddy)] + [_detection(p, buddy) for p in photos]
+        session.add_all(buddy_detections + [_detection(photos[2], stray)])
+        await session.flush()
+        buddy.cover_detection_id = buddy_detections[0].detection_id
+        await session.commit()
+
+    response = await pg_client.get("/api/v1/animals", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        {
+            "animal_id": str(buddy.animal_id),
+            "name": "Buddy",
+            "count": 3,
+            "cover_photo_url": f"https://storage.test/{settings.STORAGE_PATH_PREFIX}/{user.user_id}"
+                               f"/animals/crops/{buddy.cover_detection_id}.jpg?expires_in=3600"
+        },
+        {"animal_id": str(stray.animal_id), "name": None, "count": 1, "cover_photo_url": None},
+    ]
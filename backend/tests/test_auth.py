@@ -3,7 +3,10 @@ Basic unit tests for authentication API.
 """
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
+from app.core.security import pwd_context, verify_password
 from app.main import app
+from app.models.user import User
 
 
 @pytest.mark.asyncio
@@ -136,3 +139,43 @@ async def test_get_current_user():
         data = response.json()
         assert data["email"] == "currentuser@example.com"
         assert data["full_name"] == "Current User"
+
+
+async def _stored_hash(pg_sessionmaker, user_id):
+    async with pg_sessionmaker() as session:
+        result = await session.execute(select(User.password_hash).where(User.user_id == user_id))
+        return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_login_upgrades_bcrypt_hash_to_argon2(pg_client, pg_sessionmaker, make_user):
+    """A legacy bcrypt hash is replaced with Argon2id on the first successful login."""
+    bcrypt_hash = pwd_context.handler("bcrypt").hash("SecurePass123!")
+    user, _ = await make_user("legacy@example.com", password_hash=bcrypt_hash)
+    credentials = {"email": "legacy@example.com", "password": "SecurePass123!"}
+
+    response = await pg_client.post("/api/v1/auth/login", json=credentials)
+
+    assert response.status_code == 200, response.text
+    upgraded = await _stored_hash(pg_sessionmaker, user.user_id)
+    assert upgraded.startswith("$argon2id$")
+    assert verify_password("SecurePass123!", upgraded)
+
+    # The upgraded hash is current: logging in again works and leaves it alone
+    response = await pg_client.post("/api/v1/auth/login", json=credentials)
+    assert response.status_code == 200, response.text
+    assert await _stored_hash(pg_sessionmaker, user.user_id) == upgraded
+
+
+@pytest.mark.asyncio
+async def test_failed_login_keeps_bcrypt_hash(pg_client, pg_sessionmaker, make_user):
+    bcrypt_hash = pwd_context.handler("bcrypt").hash("SecurePass123!")
+    user, _ = await make_user("legacy-wrong@example.com", password_hash=bcrypt_hash)
+
+    response = await pg_client.post(
+        "/api/v1/auth/login",
+        json={"email": "legacy-wrong@example.com", "password": "WrongPassword!"}
+    )
+
+    assert response.status_code == 401
+    assert await _stored_hash(pg_sessionmaker, user.user_id) == bcrypt_hash
@@ -0,0 +1,53 @@
+"""
+Tests for the hashtags API.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models.photo import Photo
+from app.models.tag import PhotoTag, Tag
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_list_hashtags(pg_client, pg_sessionmaker, fake_presigner, make_user):
+    """Per-tag counts of the user's live photos, covered by the most recently taken one."""
+    user, headers = await make_user("tags@example.com")
+    other, _ = await make_user("other-tags@example.com")
+    photos = [
+        Photo(user_id=user.user_id, filename=f"IMG_{i}.jpg", mime_type="image/jpeg", size_bytes=1,
+              sha256=f"{i:064x}", storage_provider=settings.STORAGE_PROVIDER,
+              taken_at=BASE_TIME + timedelta(days=i) if i else None)
+        for i in range(3)
+    ]
+    trashed = Photo(user_id=user.user_id, filename="trashed.jpg", mime_type="image/jpeg", size_bytes=1,
+                    sha256="a" * 64, storage_provider=settings.STORAGE_PROVIDER, deleted_at=BASE_TIME)
+    theirs = Photo(user_id=other.user_id, filename="theirs.jpg", mime_type="image/jpeg", size_bytes=1,
+                   sha256="b" * 64, storage_provider=settings.STORAGE_PROVIDER)
+    receipt = Tag(name="receipt", category="documents")
+    beach = Tag(name="beach", category="places")
+    uncategorized = Tag(name="blurry")
+    async with pg_sessionmaker() as session:
+        session.add_all(photos + [trashed, theirs, receipt, beach, uncategorized])
+        await session.flush()
+        session.add_all(
+            [PhotoTag(photo_id=p.photo_id, tag_id=receipt.tag_id, confidence=1.0)
+             for p in photos + [trashed, theirs]]
+            + [PhotoTag(photo_id=photos[0].photo_id, tag_id=t.tag_id, confidence=1.0)
+               for t in (beach, uncategorized)]
+        )
+        await session.commit()
+
+    response = await pg_client.get("/api/v1/hashtags", headers=headers)
+
+    assert response.status_code == 200, response.text
+    prefix = f"https://storage.test/{settings.STORAGE_PATH_PREFIX}/{user.user_id}"
+    assert response.json() == [
+        {"tag_id": str(receipt.tag_id), "name": "receipt", "count": 3,
+         "cover_photo_url": f"{prefix}/{photos[2].photo_id}/thumbnails/thumb_512.jpg?expires_in=3600"},
+        {"tag_id": str(beach.tag_id), "name": "beach", "count": 1,
+         "cover_photo_url": f"{prefix}/{photos[0].photo_id}/thumbnails/thumb_512.jpg?expires_in=3600"},
+    ]
@@ -0,0 +1,85 @@
+"""
+Tests for the people API.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.models.person import Face, Person
+from app.models.photo import Photo
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _face(photo, person, **fields):
+    return Face(photo=photo, person=person, location_top=0, location_right=10,
+                location_bottom=10, location_left=0, **fields)
+
+
+@pytest_asyncio.fixture
+async def family(pg_sessionmaker, make_user):
+    """
+    Alice is in seven photos (one with two of her faces, three undated) and has a
+    ready cover crop; Bob's cover crop was never uploaded.
+    """
+    user, headers = await make_user("people@example.com")
+    photos = [
+        Photo(user_id=user.user_id, filename=f"IMG_{i}.jpg", mime_type="image/jpeg", size_bytes=1,
+              sha256=f"{i:064x}", storage_provider=settings.STORAGE_PROVIDER,
+              taken_at=None if i < 3 else BASE_TIME - timedelta(days=i // 2))
+        for i in range(8)
+    ]
+    alice = Person(user_id=user.user_id, name="Alice")
+    bob = Person(user_id=user.user_id, name="Bob")
+    alice_faces = [_face(photo, alice, crop_ready=True) for photo in photos[:7]]
+    bob_face = _face(photos[7], bob)
+    async with pg_sessionmaker() as session:
+        session.add_all(photos + [alice, bob, _face(photos[3], alice), bob_face] + alice_faces)
+        await session.flush()
+        alice.cover_face_id = alice_faces[0].face_id
+        bob.cover_face_id = bob_face.face_id
+        await session.commit()
+    return user, headers, alice, bob, photos[:7]
+
+
+@pytest.mark.asyncio
+async def test_list_people(pg_client, fake_presigner, family):
+    user, headers, alice, bob, _ = family
+
+    response = await pg_client.get("/api/v1/people", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        {
+            "person_id": str(alice.person_id),
+            "name": "Alice",
+            "face_count": 7,
+            "cover_photo_url": f"https://storage.test/{settings.STORAGE_PATH_PREFIX}/{user.user_id}"
+                               f"/faces/{alice.cover_face_id}.jpg?expires_in=3600"
+        },
+        {"person_id": str(bob.person_id), "name": "Bob", "face_count": 1, "cover_photo_url": None},
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [1, 2, 3, 10])
+async def test_person_photo_pages(pg_client, fake_presigner, family, limit):
+    """X-Next-Cursor pages cover each photo once, newest first with undated photos leading."""
+    _, headers, alice, _, photos = family
+    undated = sorted((p for p in photos if p.taken_at is None), key=lambda p: p.photo_id, reverse=True)
+    dated = sorted((p for p in photos if p.taken_at), key=lambda p: (p.taken_at, p.photo_id), reverse=True)
+    expected = undated + dated
+
+    ids, cursor = [], None
+    for _ in range(len(photos) + 1):
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = await pg_client.get(f"/api/v1/people/{alice.person_id}/photos", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        ids.extend(photo["photo_id"] for photo in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert ids == [str(p.photo_id) for p in expected]
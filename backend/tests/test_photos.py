@@ -0,0 +1,371 @@
+"""
+Tests for the photos API.
+"""
+import base64
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select
+
+from app.api.photos import _SORTS, _decode_cursor, _encode_cursor
+from app.core.config import settings
+from app.models.album import Album, album_photos
+from app.models.person import Face
+from app.models.photo import Photo, PhotoFile
+from app.models.tag import PhotoTag, Tag
+from app.models.user import User
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+# --- Keyset cursor -----------------------------------------------------------
+
+@pytest.mark.parametrize("sort_value", [
+    BASE_TIME,
+    BASE_TIME + timedelta(microseconds=123456),
+    datetime(2024, 5, 1, 17, 30, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    None,
+])
+def test_cursor_round_trip(sort_value):
+    photo_id = uuid.uuid4()
+    cursor = _encode_cursor(sort_value, photo_id)
+
+    assert _decode_cursor(cursor) == (sort_value, photo_id)
+    # Opaque and URL-safe
+    assert str(photo_id) not in cursor
+    assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    "abc",  # bad padding
+    _b64(b"\xff\xfe\xfd"),  # not UTF-8
+    _b64(b"no separator"),
+    _b64("2024-05-01T12:00:00+00:00|not-a-uuid".encode()),
+    _b64(f"yesterday|{uuid.uuid4()}".encode()),
+    _b64(f"2024-13-45T00:00:00|{uuid.uuid4()}".encode()),
+    _b64(b"|"),
+])
+def test_malformed_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        _decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
+
+
+# --- list_photos pagination (Postgres) ----------------------------------------
+
+def _expected_order(photos, sort):
+    """Postgres order for a _SORTS entry: NULLs first when descending, last when ascending."""
+    attr, descending, _ = _SORTS[sort]
+    present = sorted(
+        (p for p in photos if getattr(p, attr) is not None),
+        key=lambda p: (getattr(p, attr), p.photo_id),
+        reverse=descending
+    )
+    missing = sorted(
+        (p for p in photos if getattr(p, attr) is None),
+        key=lambda p: p.photo_id,
+        reverse=descending
+    )
+    ordered = missing + present if descending else present + missing
+    return [str(p.photo_id) for p in ordered]
+
+
+@pytest_asyncio.fixture
+async def timeline(pg_sessionmaker, make_user):
+    """A user's photos with tied and NULL taken_at values, plus rows list_photos must skip."""
+    user, headers = await make_user("timeline@example.com")
+    other, _ = await make_user("other@example.com")
+
+    photos = []
+    for i in range(23):
+        # Every third photo has no EXIF date; the rest share timestamps in pairs
+        taken_at = None if i % 3 == 0 else BASE_TIME - timedelta(days=i // 2)
+        photos.append(Photo(
+            user_id=user.user_id,
+            filename=f"IMG_{i:04d}.jpg",
+            mime_type="image/jpeg",
+            size_bytes=1000 + i,
+            sha256=f"{i:064x}",
+            storage_provider=settings.STORAGE_PROVIDER,
+            taken_at=taken_at,
+            uploaded_at=BASE_TIME + timedelta(hours=i // 4)
+        ))
+    hidden = [
+        Photo(user_id=other.user_id, filename="theirs.jpg", mime_type="image/jpeg", size_bytes=1,
+              sha256="a" * 64, storage_provider=settings.STORAGE_PROVIDER, taken_at=BASE_TIME),
+        Photo(user_id=user.user_id, filename="trashed.jpg", mime_type="image/jpeg", size_bytes=1,
+              sha256="b" * 64, storage_provider=settings.STORAGE_PROVIDER, taken_at=BASE_TIME,
+              deleted_at=BASE_TIME),
+        Photo(user_id=user.user_id, filename="elsewhere.jpg", mime_type="image/jpeg", size_bytes=1,
+              sha256="c" * 64, storage_provider="other-provider", taken_at=BASE_TIME),
+    ]
+    async with pg_sessionmaker() as session:
+        session.add_all(photos + hidden)
+        await session.commit()
+    return photos, headers
+
+
+async def _walk_pages(client, headers, sort, limit):
+    """Follow next_cursor to the end; returns photo ids in page order."""
+    ids, cursor = [], None
+    for _ in range(100):
+        params = {"sort": sort, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/v1/photos", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["photos"]) <= limit
+        ids.extend(photo["photo_id"] for photo in page["photos"])
+        cursor = page["next_cursor"]
+        assert page["has_more"] == (cursor is not None)
+        if not cursor:
+            return ids
+    pytest.fail("pagination did not terminate")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort", sorted(_SORTS))
+@pytest.mark.parametrize("limit", [1, 2, 5, 50])
+async def test_pages_cover_every_photo_once_in_order(pg_client, fake_presigner, timeline, sort, limit):
+    photos, headers = timeline
+
+    ids = await _walk_pages(pg_client, headers, sort, limit)
+
+    assert ids == _expected_order(photos, sort)
+
+
+@pytest.mark.asyncio
+async def test_page_boundary_inside_null_taken_at_run(pg_client, fake_presigner, timeline):
+    """A cursor taken from a NULL taken_at row resumes within the NULLs, then the dated rows."""
+    photos, headers = timeline
+    expected = _expected_order(photos, "taken_desc")
+    nulls = sum(1 for p in photos if p.taken_at is None)
+
+    response = await pg_client.get(
+        "/api/v1/photos", params={"sort": "taken_desc", "limit": nulls - 1}, headers=headers
+    )
+    first = response.json()
+    assert [p["taken_at"] for p in first["photos"]] == [None] * (nulls - 1)
+
+    response = await pg_client.get(
+        "/api/v1/photos",
+        params={"sort": "taken_desc", "limit": 3, "cursor": first["next_cursor"]},
+        headers=headers
+    )
+    second = response.json()
+    assert [p["photo_id"] for p in second["photos"]] == expected[nulls - 1:nulls + 2]
+    assert second["photos"][0]["taken_at"] is None
+    assert second["photos"][1]["taken_at"] is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cursor", ["garbage", _b64(b"2024-05-01|nope")])
+async def test_list_photos_rejects_malformed_cursor(pg_client, fake_presigner, make_user, cursor):
+    _, headers = await make_user("cursor@example.com")
+
+    response = await pg_client.get("/api/v1/photos", params={"cursor": cursor}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+# --- Permanent delete (Postgres) ---------------------------------------------
+
+@pytest.fixture
+def file_storage(mocker):
+    """Storage behind the post-response file cleanup; lists one file per photo prefix."""
+    storage = mocker.Mock()
+    storage.list_files.side_effect = lambda prefix: [{"file_id": f"{prefix}/original"}]
+    mocker.patch("app.api.photos.get_storage_service", return_value=storage)
+    return storage
+
+
+def _photo(user, i, size_bytes):
+    return Photo(
+        user_id=user.user_id,
+        filename=f"IMG_{i:04d}.jpg",
+        mime_type="image/jpeg",
+        size_bytes=size_bytes,
+        sha256=f"{i:064x}",
+        storage_provider=settings.STORAGE_PROVIDER,
+        deleted_at=BASE_TIME
+    )
+
+
+@pytest_asyncio.fixture
+async def library(pg_sessionmaker, make_user):
+    """
+    Three trashed photos with files, tags, faces and album membership, one of them the
+    album cover; plus another user's photo. The owner's quota counts all three.
+    """
+    user, headers = await make_user("deleter@example.com", storage_used_bytes=6000)
+    other, _ = await make_user("bystander@example.com", storage_used_bytes=500)
+    photos = [_photo(user, i, size) for i, size in enumerate([1000, 2000, 3000])]
+    theirs = _photo(other, 99, 500)
+    tag = Tag(name="beach")
+    album = Album(user_id=user.user_id, name="Trip", cover_photo=photos[0])
+
+    async with pg_sessionmaker() as session:
+        session.add_all(photos + [theirs, tag, album])
+        await session.flush()
+        for photo in photos + [theirs]:
+            session.add_all([
+                PhotoFile(photo_id=photo.photo_id, variant="original", format="jpeg",
+                          b2_key=f"{photo.photo_id}/original", size_bytes=photo.size_bytes),
+                PhotoTag(photo_id=photo.photo_id, tag_id=tag.tag_id, confidence=0.9),
+                Face(photo_id=photo.photo_id, location_top=0, location_right=10,
+                     location_bottom=10, location_left=0),
+            ])
+        await session.execute(insert(album_photos), [
+            {"album_id": album.album_id, "photo_id": photo.photo_id} for photo in photos
+        ])
+        await session.commit()
+    return user, headers, photos, theirs, album
+
+
+async def _rows_for(session, photo_ids):
+    """Count of rows per table that reference any of photo_ids."""
+    counts = {}
+    for name, column in [
+        ("photos", Photo.photo_id),
+        ("photo_files", PhotoFile.photo_id),
+        ("photo_tags", PhotoTag.photo_id),
+        ("faces", Face.photo_id),
+        ("album_photos", album_photos.c.photo_id),
+    ]:
+        result = await session.execute(select(func.count()).where(column.in_(photo_ids)))
+        counts[name] = result.scalar_one()
+    return counts
+
+
+async def _storage_used(session, user_id):
+    result = await session.execute(select(User.storage_used_bytes).where(User.user_id == user_id))
+    return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_permanent_delete_removes_dependent_rows(pg_client, pg_sessionmaker, file_storage, library):
+    user, headers, photos, theirs, album = library
+    gone, kept = photos[0], photos[1:]
+
+    response = await pg_client.delete(f"/api/v1/photos/{gone.photo_id}/permanent", headers=headers)
+
+    assert response.status_code == 204, response.text
+    async with pg_sessionmaker() as session:
+        assert set((await _rows_for(session, [gone.photo_id])).values()) == {0}
+        assert await _rows_for(session, [p.photo_id for p in kept]) == {
+            "photos": 2, "photo_files": 2, "photo_tags": 2, "faces": 2, "album_photos": 2
+        }
+        assert (await _rows_for(session, [theirs.photo_id]))["photo_tags"] == 1
+        assert await session.scalar(select(func.count()).select_from(Tag)) == 1
+        assert await session.scalar(select(Album.cover_photo_id).where(Album.album_id == album.album_id)) is None
+        assert await _storage_used(session, user.user_id) == 5000
+
+    file_storage.list_files.assert_called_once_with(
+        prefix=f"{settings.STORAGE_PATH_PREFIX}/{user.user_id}/{gone.photo_id}"
+    )
+    file_storage.delete_file.assert_called_once_with(
+        f"{settings.STORAGE_PATH_PREFIX}/{user.user_id}/{gone.photo_id}/original"
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_permanent_delete_only_touches_own_photos(pg_client, pg_sessionmaker, file_storage, library):
+    user, headers, photos, theirs, _ = library
+    ids = [p.photo_id for p in photos[:2]] + [theirs.photo_id, uuid.uuid4()]
+
+    response = await pg_client.post(
+        "/api/v1/photos/batch/permanent", json={"photo_ids": [str(i) for i in ids]}, headers=headers
+    )
+
+    assert response.status_code == 204, response.text
+    async with pg_sessionmaker() as session:
+        assert set((await _rows_for(session, ids[:2])).values()) == {0}
+        assert (await _rows_for(session, [photos[2].photo_id]))["photos"] == 1
+        assert await _rows_for(session, [theirs.photo_id]) == {
+            "photos": 1, "photo_files": 1, "photo_tags": 1, "faces": 1, "album_photos": 0
+        }
+        assert await _storage_used(session, user.user_id) == 3000
+        assert await _storage_used(session, theirs.user_id) == 500
+
+    deleted_prefixes = {call.kwargs["prefix"] for call in file_storage.list_files.call_args_list}
+    assert deleted_prefixes == {
+        f"{settings.STORAGE_PATH_PREFIX}/{user.user_id}/{p.photo_id}" for p in photos[:2]
+    }
+
+
+@pytest.mark.asyncio
+async def test_permanent_delete_of_unowned_photo_is_404(pg_client, pg_sessionmaker, file_storage, library):
+    user, headers, _, theirs, _ = library
+
+    response = await pg_client.delete(f"/api/v1/photos/{theirs.photo_id}/permanent", headers=headers)
+
+    assert response.status_code == 404
+    async with pg_sessionmaker() as session:
+        assert (await _rows_for(session, [theirs.photo_id]))["photos"] == 1
+        assert await _storage_used(session, user.user_id) == 6000
+    file_storage.list_files.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_freed_quota_is_floored_at_zero(pg_client, pg_sessionmaker, file_storage, make_user):
+    """A quota that drifted below the photos' sizes ends at 0, never negative."""
+    user, headers = await make_user("drifted@example.com", storage_used_bytes=100)
+    photos = [_photo(user, i, 1000) for i in range(2)]
+    async with pg_sessionmaker() as session:
+        session.add_all(photos)
+        await session.commit()
+
+    response = await pg_client.post(
+        "/api/v1/photos/batch/permanent",
+        json={"photo_ids": [str(p.photo_id) for p in photos]},
+        headers=headers
+    )
+
+    assert response.status_code == 204, response.text
+    async with pg_sessionmaker() as session:
+        assert await _storage_used(session, user.user_id) == 0
+
+
+# --- Thumbnail redirect (Postgres) --------------------------------------------
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("provider", [None, "other-provider"])
+async def test_thumbnail_redirect_is_signed_by_photos_provider(
+    pg_client, pg_sessionmaker, fake_presigner, make_user, mocker, provider
+):
+    """Default-provider photos go through the shared presigner; others through their own storage."""
+    provider = provider or settings.STORAGE_PROVIDER
+    other_storage = mocker.Mock()
+    other_storage.generate_presigned_url.side_effect = (
+        lambda key, expires_in: f"https://other.test/{key}?expires_in={expires_in}"
+    )
+    get_storage = mocker.patch("app.api.photos.get_storage_service", return_value=other_storage)
+    user, headers = await make_user("thumbs@example.com")
+    photo = _photo(user, 1, 1000)
+    photo.deleted_at = None
+    photo.storage_provider = provider
+    async with pg_sessionmaker() as session:
+        session.add(photo)
+        await session.commit()
+
+    response = await pg_client.get(f"/api/v1/photos/{photo.photo_id}/thumbnail/256", headers=headers)
+
+    assert response.status_code == 307
+    key = f"{settings.STORAGE_PATH_PREFIX}/{user.user_id}/{photo.photo_id}/thumbnails/thumb_256.jpg"
+    host = "https://storage.test" if provider == settings.STORAGE_PROVIDER else "https://other.test"
+    assert response.headers["location"] == f"{host}/{key}?expires_in={6 * 3600}"
+    assert response.headers["cache-control"].startswith("private, max-age=")
+    if provider == settings.STORAGE_PROVIDER:
+        get_storage.assert_not_called()
+    else:
+        get_storage.assert_called_once_with("other-provider")
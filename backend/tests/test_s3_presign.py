@@ -0,0 +1,97 @@
+"""
+Tests for the S3 service's local SigV4 batch signer, checked byte-for-byte
+against boto3's own presigned URLs.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.services.storage_providers.s3_service import S3Service
+
+FROZEN_NOW = datetime(2026, 10, 17, 12, 34, 56)
+
+KEYS = [
+    "uploads/3f1c/9a2b/thumbnails/thumb_256.jpg",
+    "uploads/3f1c/9a2b/original/IMG_0001.JPG",
+    "uploads/3f1c/9a2b/original/my photo (1).jpg",
+    "uploads/3f1c/9a2b/original/ünïcødé-日本.heic",
+    "uploads/3f1c/9a2b/original/a+b=c&d%20e~f!g'h*i.png",
+    "uploads/3f1c/9a2b/original/what?#hash;semi:colon,comma@at$.jpg",
+    "uploads/3f1c/9a2b//double//slash.jpg",
+]
+
+
+@pytest.fixture
+def frozen_clock(mocker):
+    """Pin the signing time for both boto3 and the batch signer."""
+    clock = {"now": FROZEN_NOW}
+    boto_datetime = mocker.patch("botocore.auth.datetime")
+    boto_datetime.datetime.utcnow.side_effect = lambda: clock["now"]
+    service_datetime = mocker.patch("app.services.storage_providers.s3_service.datetime")
+    service_datetime.utcnow.side_effect = lambda: clock["now"]
+    return clock
+
+
+def _s3_service(monkeypatch, endpoint_url, region="auto", cdn_url=""):
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", endpoint_url)
+    monkeypatch.setattr(settings, "S3_ACCESS_KEY_ID", "AKIDEXAMPLE")
+    monkeypatch.setattr(settings, "S3_SECRET_ACCESS_KEY", "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY")
+    monkeypatch.setattr(settings, "S3_BUCKET_NAME", "photobomb-media")
+    monkeypatch.setattr(settings, "S3_REGION_NAME", region)
+    monkeypatch.setattr(settings, "STORAGE_CDN_URL", cdn_url)
+    return S3Service()
+
+
+def _boto3_url(service, key, expires_in):
+    return service.s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': service.bucket_name, 'Key': key},
+        ExpiresIn=expires_in
+    )
+
+
+@pytest.mark.parametrize("endpoint_url, region", [
+    ("https://0123456789abcdef.r2.cloudflarestorage.com", "auto"),
+    ("http://minio:9000", "us-east-1"),
+    ("https://s3.eu-central-1.wasabisys.com", "eu-central-1"),
+])
+@pytest.mark.parametrize("expires_in", [60, 3600, 86400])
+def test_batch_matches_boto3(monkeypatch, frozen_clock, endpoint_url, region, expires_in):
+    service = _s3_service(monkeypatch, endpoint_url, region)
+
+    batch = service.generate_presigned_urls_batch(KEYS, expires_in)
+
+    assert batch == [_boto3_url(service, key, expires_in) for key in KEYS]
+
+
+def test_batch_matches_boto3_after_date_change(monkeypatch, frozen_clock):
+    """The cached signing key is re-derived when the UTC date rolls over."""
+    service = _s3_service(monkeypatch, "https://0123456789abcdef.r2.cloudflarestorage.com")
+    first = service.generate_presigned_urls_batch(KEYS[:1], 3600)
+
+    frozen_clock["now"] = datetime(2026, 10, 18, 0, 0, 1)
+    second = service.generate_presigned_urls_batch(KEYS[:1], 3600)
+
+    assert second != first
+    assert second == [_boto3_url(service, KEYS[0], 3600)]
+
+
+def test_batch_swaps_in_cdn_host(monkeypatch, frozen_clock):
+    """With a CDN configured only the host changes; the signature still covers the origin."""
+    origin = "https://0123456789abcdef.r2.cloudflarestorage.com"
+    cdn = "https://media.example.com"
+    service = _s3_service(monkeypatch, origin, cdn_url=cdn + "/")
+
+    batch = service.generate_presigned_urls_batch(KEYS, 3600)
+
+    for key, url in zip(KEYS, batch):
+        boto_url = _boto3_url(service, key, 3600)
+        assert boto_url.startswith(origin + "/")
+        assert url == cdn + boto_url[len(origin):]
+        assert url == service.generate_presigned_url(key, 3600)
+
+
+def test_empty_batch(monkeypatch, frozen_clock):
+    service = _s3_service(monkeypatch, "https://0123456789abcdef.r2.cloudflarestorage.com")
+    assert service.generate_presigned_urls_batch([], 3600) == []
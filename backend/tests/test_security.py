@@ -0,0 +1,88 @@
+"""
+Tests for the JWT decode cache.
+"""
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from app.core import security
+from app.core.security import create_access_token, decode_token_cached, decode_token_user_id
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    security._decoded_tokens.clear()
+    yield
+    security._decoded_tokens.clear()
+
+
+@pytest.fixture
+def decodes(mocker):
+    """Spy on the real verify that a cache miss falls through to."""
+    return mocker.patch.object(security, "decode_token", wraps=security.decode_token)
+
+
+@pytest.fixture
+def clock(mocker):
+    """Pin the wall clock the cache compares entries against; TTLCache's own timer is untouched."""
+    clock_time = mocker.patch.object(security, "time")
+    clock_time.time.return_value = time.time()
+    return clock_time.time
+
+
+def test_valid_token_is_decoded_once(decodes):
+    user_id = uuid.uuid4()
+    token = create_access_token(data={"sub": str(user_id)})
+
+    first = decode_token_cached(token)
+    assert first["sub"] == str(user_id)
+    assert decode_token_cached(token) == first
+    assert decode_token_user_id(token) == user_id
+    assert decodes.call_count == 1
+
+
+def test_cached_entry_expires_at_token_exp(decodes, clock):
+    """A token expiring inside the cache TTL is re-verified once its exp passes."""
+    token = create_access_token(data={"sub": str(uuid.uuid4())}, expires_delta=timedelta(seconds=30))
+    payload = decode_token_cached(token)
+    exp = payload["exp"]
+    assert exp < clock.return_value + security._decoded_tokens.ttl
+
+    clock.return_value = exp - 1
+    assert decode_token_cached(token) == payload
+    assert decodes.call_count == 1
+
+    # Still within the TTLCache's 60 seconds, but past exp: the entry is not served
+    clock.return_value = exp + 1
+    assert len(security._decoded_tokens) == 1
+    decode_token_cached(token)
+    assert decodes.call_count == 2
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token(data={"sub": str(uuid.uuid4())}, expires_delta=timedelta(seconds=-1))
+
+    assert decode_token_cached(token) is None
+    assert decode_token_user_id(token) is None
+
+
+def test_invalid_token_is_remembered_briefly(decodes, clock):
+    start = clock.return_value
+
+    assert decode_token_cached("not-a-jwt") is None
+    clock.return_value = start + security._INVALID_TOKEN_TTL - 1
+    assert decode_token_cached("not-a-jwt") is None
+    assert decodes.call_count == 1
+
+    clock.return_value = start + security._INVALID_TOKEN_TTL + 1
+    assert decode_token_cached("not-a-jwt") is None
+    assert decodes.call_count == 2
+
+
+def test_non_uuid_subject_has_no_user_id():
+    token = create_access_token(data={"sub": "not-a-uuid"})
+
+    assert decode_token_cached(token)["sub"] == "not-a-uuid"
+    assert decode_token_user_id(token) is None
@@ -0,0 +1,100 @@
+"""
+Tests for album share links.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.models.album import Album, album_photos
+from app.models.photo import Photo
+from app.models.share_link import ShareLink
+from app.services.presigner import THUMB_NAMES, photo_url_keys
+from app.services.storage_providers.b2_native_service import B2NativeService
+
+DOWNLOAD_URL = "https://f000.backblazeb2.com"
+BUCKET = "photobomb-test"
+
+
+@pytest.fixture
+def b2_storage(mocker, monkeypatch):
+    """Real B2 signer with its network calls stubbed: a token is 'token-for:<fileNamePrefix>'."""
+    monkeypatch.setattr(settings, "B2_BUCKET_NAME", BUCKET)
+    monkeypatch.setattr(settings, "STORAGE_CDN_URL", "")
+    storage = B2NativeService()
+    mocker.patch.object(storage, "authorize")
+    mocker.patch.object(storage.info, "get_download_url", return_value=DOWNLOAD_URL)
+    mocker.patch.object(
+        storage, "get_download_authorization",
+        side_effect=lambda prefix, valid_duration=86400: f"token-for:{prefix}"
+    )
+    mocker.spy(storage, "get_cached_download_authorization")
+    mocker.patch("app.routers.sharing.get_storage_service", return_value=storage)
+    return storage
+
+
+@pytest_asyncio.fixture
+async def shared_album(pg_sessionmaker, make_user):
+    """An owner's album with two of their three photos, shared by link."""
+    owner, _ = await make_user("owner@example.com", full_name="Owner")
+    photos = [
+        Photo(
+            user_id=owner.user_id,
+            filename=name,
+            mime_type="image/jpeg",
+            size_bytes=1000,
+            sha256=f"{i:064x}",
+            storage_provider=settings.STORAGE_PROVIDER
+        )
+        for i, name in enumerate(["beach.jpg", "sunset (2).jpg", "private.jpg"])
+    ]
+    album = Album(user_id=owner.user_id, name="Holiday")
+    share = ShareLink(album=album, token="share-token-123", is_public=True)
+    async with pg_sessionmaker() as session:
+        session.add_all(photos + [album, share])
+        await session.flush()
+        await session.execute(insert(album_photos), [
+            {"album_id": album.album_id, "photo_id": photo.photo_id} for photo in photos[:2]
+        ])
+        await session.commit()
+    return owner, photos[:2], photos[2]
+
+
+@pytest.mark.asyncio
+async def test_shared_album_viewer_gets_per_file_urls(pg_client, make_user, b2_storage, shared_album):
+    owner, shared, private = shared_album
+    _, viewer_headers = await make_user("viewer@example.com")
+
+    response = await pg_client.get("/api/v1/shared/share-token-123", headers=viewer_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    by_id = {photo["photo_id"]: photo for photo in body["photos"]}
+    assert set(by_id) == {str(photo.photo_id) for photo in shared}
+
+    expected_keys = set()
+    for photo in shared:
+        keys = photo_url_keys(owner.user_id, photo.photo_id, photo.filename)
+        expected_keys.update(keys)
+        # Working URLs: each one names its file and carries a token for exactly that file
+        assert by_id[str(photo.photo_id)]["thumb_urls"] == {
+            name: f"{DOWNLOAD_URL}/file/{BUCKET}/{key}?Authorization=token-for:{key}"
+            for name, key in zip(THUMB_NAMES, keys)
+        }
+
+    # Tokens were only minted for the shared files themselves: none covers the
+    # owner's prefix or any file outside the share
+    prefixes = {call.args[0] for call in b2_storage.get_download_authorization.call_args_list}
+    assert prefixes == expected_keys
+    outside = photo_url_keys(owner.user_id, private.photo_id, private.filename)
+    assert not any(key.startswith(prefix) for prefix in prefixes for key in outside)
+    assert not any(f"{settings.STORAGE_PATH_PREFIX}/{owner.user_id}/".startswith(p) for p in prefixes)
+    b2_storage.get_cached_download_authorization.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_unknown_share_token_is_404(pg_client, b2_storage):
+    response = await pg_client.get("/api/v1/shared/no-such-token")
+
+    assert response.status_code == 404
+    b2_storage.get_download_authorization.assert_not_called()
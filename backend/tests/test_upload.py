@@ -0,0 +1,38 @@
+"""
+Tests for the upload API.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.celery_app import celery_app
+from app.core.user_cache import get_user_cached
+from app.models.user import User
+
+
+@pytest.mark.asyncio
+async def test_concurrent_direct_uploads_count_every_byte(pg_client, pg_sessionmaker, make_user, mocker):
+    """Uploads authenticated from the same cached (stale) user row must not overwrite each other's usage."""
+    mocker.patch("app.api.upload.get_storage_service")
+    mocker.patch.object(celery_app, "send_task")
+    user, headers = await make_user("uploader@example.com", storage_used_bytes=0)
+
+    # Warm the user cache so both requests start from the same cached row
+    async with pg_sessionmaker() as db:
+        await get_user_cached(db, user.user_id)
+
+    payloads = [b"a" * 100, b"b" * 250, b"c" * 4000]
+    responses = await asyncio.gather(*[
+        pg_client.post(
+            "/api/v1/upload/direct",
+            files={"file": (f"photo_{i}.jpg", content, "image/jpeg")},
+            headers=headers
+        )
+        for i, content in enumerate(payloads)
+    ])
+    assert [r.status_code for r in responses] == [202] * len(payloads)
+
+    async with pg_sessionmaker() as db:
+        result = await db.execute(select(User.storage_used_bytes).where(User.user_id == user.user_id))
+        assert result.scalar_one() == sum(len(p) for p in payloads)
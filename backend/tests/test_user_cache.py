@@ -0,0 +1,137 @@
+"""
+Tests for the short-lived user row cache used by the auth dependencies.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, inspect, select, update
+
+from app.core import user_cache
+from app.core.user_cache import get_user_cached, invalidate_user
+from app.models.user import User
+
+
+@pytest.fixture
+def statements(pg_sessionmaker):
+    """SQL statements executed on the test engine, in order."""
+    executed = []
+    engine = pg_sessionmaker.kw["bind"].sync_engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _selects(executed):
+    return [s for s in executed if s.lstrip().upper().startswith("SELECT")]
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_select(pg_sessionmaker, make_user, statements):
+    """A second lookup within the TTL is served without querying users."""
+    user, _ = await make_user("hit@example.com")
+
+    async with pg_sessionmaker() as db:
+        first = await get_user_cached(db, user.user_id)
+    assert first.email == "hit@example.com"
+    assert len(_selects(statements)) == 1
+
+    async with pg_sessionmaker() as db:
+        second = await get_user_cached(db, str(user.user_id))
+    assert second.user_id == user.user_id
+    assert second.email == "hit@example.com"
+    assert len(_selects(statements)) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_user_is_merged_clean_into_session(pg_sessionmaker, make_user):
+    """A cache hit is a persistent, unmodified instance of the caller's session."""
+    user, _ = await make_user("merged@example.com", storage_used_bytes=123)
+
+    async with pg_sessionmaker() as db:
+        await get_user_cached(db, user.user_id)
+
+    async with pg_sessionmaker() as db:
+        cached = await get_user_cached(db, user.user_id)
+        state = inspect(cached)
+        assert state.persistent
+        assert state.session is db.sync_session
+        assert cached in db
+        assert not db.dirty
+        assert cached.storage_used_bytes == 123
+
+        # Changes to it are flushed like any loaded instance
+        cached.full_name = "Renamed"
+        await db.commit()
+
+    async with pg_sessionmaker() as db:
+        result = await db.execute(select(User.full_name).where(User.user_id == user.user_id))
+        assert result.scalar_one() == "Renamed"
+
+
+@pytest.mark.asyncio
+async def test_orm_update_evicts_entry(pg_sessionmaker, make_user, statements):
+    """after_update drops the cached row, so the next lookup sees the new value."""
+    user, _ = await make_user("update@example.com")
+
+    async with pg_sessionmaker() as db:
+        cached = await get_user_cached(db, user.user_id)
+        assert str(user.user_id) in user_cache._users
+        cached.full_name = "Updated"
+        await db.commit()
+    assert str(user.user_id) not in user_cache._users
+
+    selects_before = len(_selects(statements))
+    async with pg_sessionmaker() as db:
+        fresh = await get_user_cached(db, user.user_id)
+    assert fresh.full_name == "Updated"
+    assert len(_selects(statements)) == selects_before + 1
+
+
+@pytest.mark.asyncio
+async def test_orm_delete_evicts_entry(pg_sessionmaker, make_user):
+    """after_delete drops the cached row, so a deleted user stops authenticating."""
+    user, _ = await make_user("delete@example.com")
+
+    async with pg_sessionmaker() as db:
+        cached = await get_user_cached(db, user.user_id)
+        await db.delete(cached)
+        await db.commit()
+    assert str(user.user_id) not in user_cache._users
+
+    async with pg_sessionmaker() as db:
+        assert await get_user_cached(db, user.user_id) is None
+
+
+@pytest.mark.asyncio
+async def test_soft_deleted_user_is_not_returned(pg_sessionmaker, make_user):
+    user, _ = await make_user("soft@example.com", deleted_at=datetime.now(timezone.utc))
+
+    async with pg_sessionmaker() as db:
+        assert await get_user_cached(db, user.user_id) is None
+    assert str(user.user_id) not in user_cache._users
+
+
+@pytest.mark.asyncio
+async def test_invalidate_user_after_core_update(pg_sessionmaker, make_user):
+    """Core UPDATEs bypass the ORM events; invalidate_user evicts explicitly."""
+    user, _ = await make_user("core@example.com", storage_used_bytes=0)
+
+    async with pg_sessionmaker() as db:
+        await get_user_cached(db, user.user_id)
+
+    async with pg_sessionmaker() as db:
+        await db.execute(
+            update(User).where(User.user_id == user.user_id).values(storage_used_bytes=5)
+        )
+        await db.commit()
+
+    async with pg_sessionmaker() as db:
+        assert (await get_user_cached(db, user.user_id)).storage_used_bytes == 0
+
+    invalidate_user(user.user_id)
+    async with pg_sessionmaker() as db:
+        assert (await get_user_cached(db, user.user_id)).storage_used_bytes == 5